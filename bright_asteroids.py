@@ -1,26 +1,54 @@
 """
 Module for calculating positions of bright minor planets (asteroids)
 """
-from skyfield.api import Topos, load
-from skyfield.constants import GM_SUN_Pitjeva_2005_km3_s2
+from skyfield.api import Topos, load, load_file
+from skyfield.constants import AU_KM, DAY_S, GM_SUN_Pitjeva_2005_km3_s2
+from skyfield.vectorlib import VectorFunction
 import pandas as pd
-from skyfield import almanac
 import numpy as np
 import os
-import pickle
-from datetime import datetime, timedelta, timezone
-import gzip
+from datetime import datetime, timedelta
+import io
+import urllib.error
 import urllib.request
-from skyfield.data import mpc
+import email.utils
+import time
+import shutil
+import tempfile
+import threading
+from skyfield.data.spice import inertial_frames
 import math
-from types import SimpleNamespace
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+try:
+    # ISA-L (python-isal) dekomprimiert gzip deutlich schneller als zlib; optional
+    from isal import igzip as gzip_mod
+except ImportError:
+    import gzip as gzip_mod
+
+try:
+    # Numba übersetzt den Kepler-Löser in parallelen Maschinencode; optional
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Die FastAPI-Endpunkte laufen im Threadpool, Anfragen also gleichzeitig: Numbas workqueue-
+# Threading-Layer bricht bei überlappenden prange-Aufrufen den ganzen Prozess ab, und Download
+# sowie Cache-Aufbau in load_bright_asteroids() dürfen nicht parallel in dieselben Dateien schreiben.
+# Reentrant, weil load_bright_asteroids() unter der Sperre heliocentric_positions() aufruft.
+ASTEROID_LOCK = threading.RLock()
 
 # Konstanten für Cache-Dateien
-ASTEROID_DF_CACHE_FILE = 'cache/asteroids_dataframe.pkl'
-BRIGHT_ASTEROID_CACHE_FILE = 'cache/bright_asteroid_cache.pkl'
-COMET_CACHE_FILE = 'cache/comet_cache.pkl'
+MPCORB_ELEMENTS_CACHE_FILE = 'cache/mpcorb_parsed.npz'
+BRIGHT_ASTEROID_CACHE_FILE = 'cache/bright_asteroid_cache.npz'
+COMET_CACHE_FILE = 'cache/comet_cache.npz'
 MPCORB_FILE = 'cache/MPCORB.DAT.gz'
 MPCORB_URL = 'https://www.minorplanetcenter.net/iau/MPCORB/MPCORB.DAT.gz'
+# Last-Modified-Header des letzten Downloads (für If-Modified-Since); mtime = letzte Prüfung
+MPCORB_LAST_MODIFIED_FILE = 'cache/MPCORB.DAT.gz.last-modified'
 MAX_ASTEROIDS = 20000
 # Magnitude thresholds (restored defaults)
 # H-limit for prefiltering by absolute magnitude (smaller = brighter)
@@ -31,12 +59,74 @@ MAX_APPARENT_MAGNITUDE = 10.0
 MAX_ASTEROIDS_MAGNITUDE = MAX_ABSOLUTE_MAGNITUDE
 # Gravitationskonstante der Sonne für Skyfield
 GM_SUN = 1.32712440041e20
+# Dieselbe Konstante in AU^3/Tag^2 für die vektorisierte Bahnpropagation
+GM_SUN_AU3_D2 = GM_SUN_Pitjeva_2005_km3_s2 * DAY_S * DAY_S / AU_KM ** 3
+# Rotation ekliptikale J2000-Koordinaten -> ICRS (wie in mpc.mpcorb_orbit)
+ECLIPTIC_TO_ICRS = inertial_frames['ECLIPJ2000'].T
+
+# Spalten der geparsten MPCORB-Bahnelemente (numerisch bzw. Text) für den SoA-Cache
+MPCORB_NUMERIC_COLUMNS = [
+    'magnitude_H', 'magnitude_G', 'mean_anomaly_degrees', 'argument_of_perihelion_degrees',
+    'longitude_of_ascending_node_degrees', 'inclination_degrees', 'eccentricity',
+    'mean_daily_motion_degrees', 'semimajor_axis_au'
+]
+MPCORB_TEXT_COLUMNS = ['designation', 'epoch_packed']
+
+# Spaltenbereiche im Festbreitenformat (https://minorplanetcenter.net/iau/info/MPOrbitFormat.html)
+MPCORB_COLUMN_SPECS = {
+    'magnitude_H': (8, 13),
+    'magnitude_G': (14, 19),
+    'epoch_packed': (20, 25),
+    'mean_anomaly_degrees': (26, 35),
+    'argument_of_perihelion_degrees': (37, 46),
+    'longitude_of_ascending_node_degrees': (48, 57),
+    'inclination_degrees': (59, 68),
+    'eccentricity': (70, 79),
+    'mean_daily_motion_degrees': (80, 91),
+    'semimajor_axis_au': (92, 103),
+    'designation': (166, 194),
+}
+# Länge eines MPCORB-Datensatzes; kürzere Zeilen werden mit Leerzeichen aufgefüllt
+MPCORB_RECORD_LENGTH = 202
+
+# Felder des Ergebnis-Caches in Ausgabereihenfolge; Textfelder speichern None als ''
+BRIGHT_ASTEROID_FIELDS = [
+    'name', 'number', 'magnitude', 'ra', 'dec', 'altitude', 'azimuth', 'distance',
+    'rise_time', 'set_time', 'transit_time'
+]
+BRIGHT_ASTEROID_TEXT_FIELDS = {'name', 'number', 'rise_time', 'set_time', 'transit_time'}
+# Zeitabhängige Felder, die bei jedem Laden des Caches neu berechnet werden
+BRIGHT_ASTEROID_POSITION_FIELDS = ['ra', 'dec', 'altitude', 'azimuth', 'distance']
+
+# Bahnelemente aus mpc.load_comets_dataframe(), die comet_orbit_constants() benötigt
+COMET_ELEMENT_COLUMNS = [
+    'perihelion_year', 'perihelion_month', 'perihelion_day', 'perihelion_distance_au',
+    'eccentricity', 'argument_of_perihelion_degrees', 'longitude_of_ascending_node_degrees',
+    'inclination_degrees'
+]
+
+# Blockgröße beim Herunterladen von MPCORB.DAT.gz
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 60
+# Abstand, in dem per bedingtem GET nach einer neueren MPCORB.DAT.gz gefragt wird
+MPCORB_CHECK_INTERVAL_HOURS = 24
+
+# Lesepuffer für MPCORB.DAT.gz (Standard wären 8 KiB, vgl. CPython gh-95534)
+MPCORB_READ_BUFFER_SIZE = 128 * 1024
+
+# Mindestanzahl Asteroiden pro Worker-Prozess, ab der parallel gerechnet wird. Ein Worker
+# kostet ca. 0,2 s Start (Zeitskala/Ephemeride laden), ein Asteroid im vektorisierten
+# Batch nur wenige ms: kleinere Teilstücke wären parallel langsamer als seriell.
+PARALLEL_MIN_BATCH_SIZE = 200
 
 # Cache-Gültigkeitsdauer in Stunden
 CACHE_VALIDITY_HOURS = 6
 
-# Ensure cache directory exists
-os.makedirs("cache", exist_ok=True)
+# Auf-/Untergangssuche: Horizont inkl. Refraktion (wie Skyfield almanac) und Abtastschritt
+# (grob, da find_horizon_events kubisch zwischen den Stützstellen interpoliert)
+HORIZON_DEGREES = -34.0 / 60.0
+RISE_SET_STEP_MINUTES = 15
+RISE_SET_WINDOW_DAYS = 2
 
 def format_time(dt):
     """
@@ -48,8 +138,116 @@ def format_time(dt):
         return None
     
     # Konvertiere zu lokaler Zeit und gebe nur HH:MM zurück (ohne 'Uhr')
-    local_time = dt.astimezone()
-    return f"{local_time.hour:02d}:{local_time.minute:02d}"
+    return dt.astimezone().strftime("%H:%M")
+
+def _cubic_crossing(values, i, tol=1e-12):
+    """
+    Nullstelle des kubischen Lagrange-Polynoms durch die vier Stützstellen um values[i..i+1]
+    (gleichabständiges Gitter) per Illinois-Verfahren im Intervall [i, i+1].
+    Rein skalar mit Python-Floats; gibt den Bruchteil des Intervalls zurück.
+    """
+    first = min(max(i - 1, 0), len(values) - 4)
+    y0, y1, y2, y3 = (float(v) for v in values[first:first + 4])
+
+    def p(x):
+        return (-y0 * (x - 1) * (x - 2) * (x - 3) / 6 + y1 * x * (x - 2) * (x - 3) / 2
+                - y2 * x * (x - 1) * (x - 3) / 2 + y3 * x * (x - 1) * (x - 2) / 6)
+
+    lo, hi = float(i - first), float(i - first + 1)
+    f_lo, f_hi = p(lo), p(hi)
+    for _ in range(60):
+        if f_hi == f_lo:
+            break
+        x = hi - f_hi * (hi - lo) / (f_hi - f_lo)
+        fx = p(x)
+        if fx * f_hi < 0:
+            lo, f_lo = hi, f_hi
+        else:
+            f_lo /= 2
+        hi, f_hi = x, fx
+        if fx == 0 or abs(hi - lo) < tol:
+            break
+    return hi - (i - first)
+
+@lru_cache(maxsize=16)
+def location_topos(lat, lon, elevation):
+    """
+    Topos für einen Beobachterstandort. Die standortabhängigen Größen (Sinus/Kosinus der
+    Breite, Rotationsmatrix) werden so nur einmal pro Standort berechnet und von Cache-Abruf,
+    Kandidatenauswahl und Ereignissuche gemeinsam genutzt.
+    """
+    return Topos(latitude_degrees=lat, longitude_degrees=lon, elevation_m=elevation)
+
+def local_day_tt(ts):
+    """
+    Beginn und Ende des heutigen lokalen Tages als TT-Julianische Daten.
+    """
+    local_midnight = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (ts.from_datetime(local_midnight).tt,
+            ts.from_datetime(local_midnight + timedelta(days=1)).tt)
+
+def _grid_crossing_jd(values, i, jd, step):
+    """
+    TT-Julianisches Datum des Nulldurchgangs von values zwischen den Gitterpunkten i und i+1,
+    kubisch verfeinert (linear bei weniger als vier Stützstellen).
+    """
+    if len(values) >= 4:
+        frac = _cubic_crossing(values, i)
+    else:
+        frac = -values[i] / (values[i + 1] - values[i])
+    return float(jd[i]) + frac * step
+
+def horizon_crossings(time_grid, altitudes, horizon=HORIZON_DEGREES):
+    """
+    Alle Aufgänge und Untergänge im Zeitgitter als zwei Listen von TT-Julianischen Daten,
+    verfeinert wie in find_horizon_events().
+    """
+    alt = np.asarray(altitudes, dtype=float) - horizon
+    jd = time_grid.tt
+    step = float(jd[1] - jd[0]) if len(jd) > 1 else 0.0
+    above = alt >= 0
+    rises = [_grid_crossing_jd(alt, i, jd, step) for i in np.flatnonzero(~above[:-1] & above[1:])]
+    sets = [_grid_crossing_jd(alt, i, jd, step) for i in np.flatnonzero(above[:-1] & ~above[1:])]
+    return rises, sets
+
+def find_horizon_events(time_grid, altitudes, hour_angles, horizon=HORIZON_DEGREES, local_day=None):
+    """
+    Bestimmt Aufgang, Untergang und obere Kulmination aus abgetasteten Altituden und Stundenwinkeln.
+    Aufgang/Untergang sind Vorzeichenwechsel von (Altitude - Horizont), die Kulmination ist der
+    Nulldurchgang des Stundenwinkels von Ost nach West am heutigen lokalen Tag. Jeder Durchgang
+    wird über ein kubisches Polynom durch die vier umliegenden Stützstellen verfeinert, daher
+    reicht ein grobes Gitter ohne zusätzliche Ephemeriden-Auswertungen.
+    local_day kann das Ergebnis von local_day_tt() sein, wenn viele Objekte ausgewertet werden.
+    Gibt (rise, set, transit) als UTC-datetime-Objekte oder None zurück.
+    """
+    alt = np.asarray(altitudes, dtype=float) - horizon
+    ha = np.asarray(hour_angles, dtype=float)
+    jd = time_grid.tt
+    step = float(jd[1] - jd[0]) if len(jd) > 1 else 0.0
+
+    def crossing_jd(values, i):
+        return _grid_crossing_jd(values, i, jd, step)
+
+    above = alt >= 0
+    rises = np.flatnonzero(~above[:-1] & above[1:])
+    sets = np.flatnonzero(above[:-1] & ~above[1:])
+
+    # Obere Kulmination: Stundenwinkel wechselt von negativ (östlich) zu positiv (westlich);
+    # der Sprung von +12h auf -12h (untere Kulmination) fällt dabei nicht ins Gewicht
+    ts = time_grid.ts
+    day_start, day_end = local_day if local_day is not None else local_day_tt(ts)
+    transits = [crossing_jd(ha, i) for i in np.flatnonzero((ha[:-1] < 0) & (ha[1:] >= 0))]
+    today = [x for x in transits if day_start <= x < day_end]
+    transit_jd = today[0] if today else (transits[0] if transits else None)
+
+    events = [crossing_jd(alt, rises[0]) if len(rises) else None,
+              crossing_jd(alt, sets[0]) if len(sets) else None,
+              transit_jd]
+    known = [e for e in events if e is not None]
+    if not known:
+        return None, None, None
+    utc_times = iter(ts.tt_jd(np.array(known)).utc_datetime())
+    return tuple(next(utc_times) if e is not None else None for e in events)
 
 # IAU H-G asteroid magnitude system
 def asteroid_apparent_magnitude(H, G, r, delta, phase_angle_deg):
@@ -58,62 +256,766 @@ def asteroid_apparent_magnitude(H, G, r, delta, phase_angle_deg):
     V = H + 5 log10(r * delta) - 2.5 log10((1 - G) * Phi1 + G * Phi2)
     with Phi1 = exp(-3.33 * tan(alpha/2)^0.63) and Phi2 = exp(-1.87 * tan(alpha/2)^1.22)
     """
+    # Ohne try/except: negative Phasenwinkel auf 0 klemmen; bei alpha = 0 ist die Phasenfunktion 1
+    alpha = max(0.0, math.radians(phase_angle_deg))
+    distance_term = float(H) + 5.0 * math.log10(max(r * delta, 1e-12))
+    if alpha == 0.0:
+        return distance_term
+    tan_half = max(math.tan(alpha / 2.0), 0.0)
+    # Phase functions
+    phi1 = math.exp(-3.33 * (tan_half ** 0.63))
+    phi2 = math.exp(-1.87 * (tan_half ** 1.22))
+    # Avoid log of zero
+    flux_term = max((1.0 - float(G)) * phi1 + float(G) * phi2, 1e-12)
+    return distance_term - 2.5 * math.log10(flux_term)
+
+def asteroid_apparent_magnitude_vec(H, G, r, delta, phase_angle_deg=None, tan_half=None):
+    """
+    Vectorized IAU H-G apparent magnitude for NumPy arrays of equal length.
+    Same formula as asteroid_apparent_magnitude(); invalid inputs yield NaN.
+    Instead of phase_angle_deg, tan(alpha/2) may be passed directly as tan_half.
+    """
+    if tan_half is None:
+        tan_half = np.tan(np.radians(phase_angle_deg) / 2.0)
+    phi1 = np.exp(-3.33 * tan_half ** 0.63)
+    phi2 = np.exp(-1.87 * tan_half ** 1.22)
+    flux_term = np.maximum((1.0 - G) * phi1 + G * phi2, 1e-12)
+    return H + 5.0 * np.log10(np.maximum(r * delta, 1e-12)) - 2.5 * np.log10(flux_term)
+
+@contextmanager
+def open_mpcorb():
+    """
+    Öffnet MPCORB.DAT.gz als gepufferten Binärstrom (128 KiB) mit ISA-L bzw. zlib.
+    parse_mpcorb() liest nur den Anfang der Datei; ein paralleler Dekompressor wie
+    rapidgzip würde dabei weit über das Benötigte hinaus vorauslesen.
+    """
+    with open(MPCORB_FILE, 'rb', buffering=MPCORB_READ_BUFFER_SIZE) as raw, \
+            gzip_mod.open(raw, 'rb') as gz, \
+            io.BufferedReader(gz, buffer_size=MPCORB_READ_BUFFER_SIZE) as f:
+        yield f
+
+if njit is not None:
+    # Ohne fastmath: NaN-Zeilen (ungültige Elemente) müssen NaN bleiben
+    @njit(cache=True)
+    def _kepler_markley_numba(M, e):
+        # Skalare Fassung von _kepler_markley() für die kompilierten Schleifen
+        M = M % (2.0 * np.pi)
+        high = M > np.pi
+        if high:
+            M = 2.0 * np.pi - M
+        ome = 1.0 - e
+        alpha = (3.0 * np.pi + 1.6 * (np.pi - M) / (1.0 + e)) / (np.pi - 6.0 / np.pi)
+        d = 3.0 * ome + alpha * e
+        alpha_d = alpha * d
+        r = (3.0 * alpha_d * (d - ome) + M * M) * M
+        q = 2.0 * alpha_d * ome - M * M
+        q2 = q * q
+        w = np.cbrt(abs(r) + np.sqrt(q2 * q + r * r)) ** 2
+        E = (2.0 * r * w / (w * w + w * q + q2) + M) / d
+        sin_E, cos_E = np.sin(E), np.cos(E)
+        f0 = e * (E - sin_E) + E * ome - M
+        f1 = e * (1.0 - cos_E) + ome
+        f2 = e * sin_E
+        f3 = 1.0 - f1
+        d3 = -f0 / (f1 - 0.5 * f0 * f2 / f1)
+        d4 = -f0 / (f1 + 0.5 * d3 * f2 + d3 * d3 * f3 / 6.0)
+        E = E - f0 / (f1 + 0.5 * d4 * f2 + d4 * d4 * f3 / 6.0 - d4 * d4 * d4 * f2 / 24.0)
+        return 2.0 * np.pi - E if high else E
+
+    @njit(parallel=True, cache=True)
+    def _propagate_numba(M0, mean_motion, dt, a, e, b, P, Q, with_velocity):
+        # Kepler-Lösung, Bahnebene und ICRS-Achsen in einer Schleife pro Bahn:
+        # keine (N,)-Zwischenarrays, nur Position und Geschwindigkeit werden geschrieben
+        n = M0.shape[0]
+        position = np.empty((n, 3))
+        velocity = np.empty((n, 3) if with_velocity else (0, 3))
+        for k in prange(n):
+            E = _kepler_markley_numba(M0[k] + mean_motion[k] * dt[k], e[k])
+            cos_E, sin_E = np.cos(E), np.sin(E)
+            x_orb = a[k] * (cos_E - e[k])
+            y_orb = b[k] * sin_E
+            for j in range(3):
+                position[k, j] = P[k, j] * x_orb + Q[k, j] * y_orb
+            if with_velocity:
+                E_dot = mean_motion[k] / (1.0 - e[k] * cos_E)
+                vx_orb = -a[k] * sin_E * E_dot
+                vy_orb = b[k] * cos_E * E_dot
+                for j in range(3):
+                    velocity[k, j] = P[k, j] * vx_orb + Q[k, j] * vy_orb
+        return position, velocity
+
+def _kepler_markley(M, e):
+    """
+    Nicht-iterativer Kepler-Löser nach Markley (1995) für ganze Arrays: kubischer Startwert
+    und eine Korrektur fünfter Ordnung, Genauigkeit nahe Maschinengenauigkeit.
+    Nutzt die Symmetrie E(2π - M) = 2π - E(M), damit der Startwert nur M in [0, π] braucht.
+    """
+    M = np.remainder(M, 2.0 * np.pi)
+    high = M > np.pi
+    M = np.where(high, 2.0 * np.pi - M, M)
+    ome = 1.0 - e
+
+    # Startwert
+    alpha = (3.0 * np.pi + 1.6 * (np.pi - M) / (1.0 + e)) / (np.pi - 6.0 / np.pi)
+    d = 3.0 * ome + alpha * e
+    alpha_d = alpha * d
+    r = (3.0 * alpha_d * (d - ome) + M * M) * M
+    q = 2.0 * alpha_d * ome - M * M
+    q2 = q * q
+    w = np.square(np.cbrt(np.abs(r) + np.sqrt(q2 * q + r * r)))
+    E = (2.0 * r * w / (w * w + w * q + q2) + M) / d
+
+    # Korrektur fünfter Ordnung
+    sin_E, cos_E = np.sin(E), np.cos(E)
+    f0 = e * (E - sin_E) + E * ome - M
+    f1 = e * (1.0 - cos_E) + ome
+    f2 = e * sin_E
+    f3 = 1.0 - f1
+    d3 = -f0 / (f1 - 0.5 * f0 * f2 / f1)
+    d4 = -f0 / (f1 + 0.5 * d3 * f2 + d3 * d3 * f3 / 6.0)
+    E = E - f0 / (f1 + 0.5 * d4 * f2 + d4 * d4 * f3 / 6.0 - d4 * d4 * d4 * f2 / 24.0)
+    return np.where(high, 2.0 * np.pi - E, E)
+
+def solve_kepler(M, e):
+    """
+    Löst die Kepler-Gleichung E - e sin E = M für ganze Arrays mit _kepler_markley().
+    M in Bogenmaß, 0 <= e < 1. Gibt die exzentrische Anomalie E zurück.
+    """
+    return _kepler_markley(np.asarray(M, dtype=np.float64), np.asarray(e, dtype=np.float64))
+
+def epoch_packed_to_tt(ts, epoch_packed):
+    """
+    Wandelt gepackte MPC-Epochen (z.B. 'K24AH') in TT-Julianische Daten um.
+    Jede unterschiedliche Epoche wird nur einmal dekodiert.
+    """
+    codes, inverse = np.unique(np.asarray(epoch_packed, dtype=str), return_inverse=True)
+
+    def n(c):
+        return ord(c) - (48 if c.isdigit() else 55)
+
+    years = [100 * n(code[0]) + int(code[1:3]) for code in codes]
+    months = [n(code[3]) for code in codes]
+    days = [n(code[4]) for code in codes]
+    return ts.tt(years, months, days).tt[inverse]
+
+def orbit_axes(inclination_degrees, node_degrees, perihelion_degrees):
+    """
+    Bahnebenen-Achsen P (Richtung Perihel) und Q (senkrecht dazu in der Bahnebene)
+    aller Bahnen als (N, 3)-Arrays, bereits von ekliptikalen J2000-Koordinaten nach ICRS gedreht.
+    """
+    inc = np.radians(np.asarray(inclination_degrees, dtype=float))
+    node = np.radians(np.asarray(node_degrees, dtype=float))
+    peri = np.radians(np.asarray(perihelion_degrees, dtype=float))
+    cos_node, sin_node = np.cos(node), np.sin(node)
+    cos_peri, sin_peri = np.cos(peri), np.sin(peri)
+    cos_inc, sin_inc = np.cos(inc), np.sin(inc)
+    P = np.stack([cos_peri * cos_node - sin_peri * sin_node * cos_inc,
+                  cos_peri * sin_node + sin_peri * cos_node * cos_inc,
+                  sin_peri * sin_inc], axis=1)
+    Q = np.stack([-sin_peri * cos_node - cos_peri * sin_node * cos_inc,
+                  -sin_peri * sin_node + cos_peri * cos_node * cos_inc,
+                  cos_peri * sin_inc], axis=1)
+    return P @ ECLIPTIC_TO_ICRS.T, Q @ ECLIPTIC_TO_ICRS.T
+
+def orbit_constants(df, ts):
+    """
+    Berechnet die zeitunabhängigen Größen aller Bahnen von df einmalig: Winkel in Bogenmaß,
+    deren Sinus/Kosinus und daraus die Bahnebenen-Achsen P und Q, bereits nach ICRS gedreht.
+    """
+    a = df['semimajor_axis_au'].to_numpy(dtype=float)
+    e = df['eccentricity'].to_numpy(dtype=float)
+    e = np.where(e < 1.0, e, np.nan)
+    P, Q = orbit_axes(df['inclination_degrees'].to_numpy(dtype=float),
+                      df['longitude_of_ascending_node_degrees'].to_numpy(dtype=float),
+                      df['argument_of_perihelion_degrees'].to_numpy(dtype=float))
+    return {
+        'a': a,
+        'e': e,
+        'b': a * np.sqrt(1.0 - e * e),
+        'mean_motion': np.sqrt(GM_SUN_AU3_D2 / a ** 3),
+        'M0': np.radians(df['mean_anomaly_degrees'].to_numpy(dtype=float)),
+        'epoch_tt': epoch_packed_to_tt(ts, df['epoch_packed'].to_numpy()),
+        'P': P,
+        'Q': Q,
+    }
+
+def heliocentric_positions(df, ts, t, with_velocity=False, constants=None):
+    """
+    Propagiert die MPCORB-Bahnelemente aller Zeilen von df gemeinsam zum Zeitpunkt t
+    (ein Zeitpunkt oder einer pro Zeile). Liefert heliozentrische ICRS-Positionen (N, 3)
+    in AU, mit with_velocity=True zusätzlich die Geschwindigkeiten (N, 3) in AU/Tag.
+    Bahnen mit e >= 1 ergeben NaN. constants kann ein Ergebnis von orbit_constants(df, ts) sein.
+    """
+    c = constants if constants is not None else orbit_constants(df, ts)
+    a, e, b = c['a'], c['e'], c['b']
+    if njit is not None:
+        dt = np.ascontiguousarray(np.broadcast_to(t.tt - c['epoch_tt'], a.shape), dtype=np.float64)
+        with ASTEROID_LOCK:
+            position, velocity = _propagate_numba(c['M0'], c['mean_motion'], dt, a, e, b,
+                                                  c['P'], c['Q'], with_velocity)
+        return (position, velocity) if with_velocity else position
+
+    M = np.remainder(c['M0'] + c['mean_motion'] * (t.tt - c['epoch_tt']), 2.0 * np.pi)
+    E = solve_kepler(M, e)
+    cos_E, sin_E = np.cos(E), np.sin(E)
+
+    # P und Q sind bereits nach ICRS gedreht: x P + y Q ergibt direkt die ICRS-Position,
+    # ohne ekliptikales Zwischenergebnis und mit nur einem (N, 3)-Array pro Vektor
+    position = c['P'] * (a * (cos_E - e))[:, None]
+    position += c['Q'] * (b * sin_E)[:, None]
+    if not with_velocity:
+        return position
+
+    E_dot = c['mean_motion'] / (1.0 - e * cos_E)
+    velocity = c['P'] * (-a * sin_E * E_dot)[:, None]
+    velocity += c['Q'] * (b * cos_E * E_dot)[:, None]
+    return position, velocity
+
+class KeplerOrbitBatch(VectorFunction):
+    """
+    Alle Bahnen eines DataFrames als eine Skyfield-Vektorfunktion vom Baryzentrum aus
+    (Sonne + heliocentric_positions()). observe(), apparent(), radec() und altaz() liefern
+    damit Arrays über alle Bahnen statt eines Aufrufs pro mpc.mpcorb_orbit().
+    Mit repeat=M steht jede Bahn M-mal hintereinander, z.B. für ein Zeitgitter je Bahn.
+    """
+    center = 0
+
+    def __init__(self, df, ts, sun, target='MPCORB', repeat=1):
+        self.df = df
+        self.ts = ts
+        self.sun = sun
+        self.target = target
+        self.ephemeris = getattr(sun, 'ephemeris', None)
+        # observe() ruft _at() für die Lichtlaufzeit mehrfach auf
+        self.constants = {key: np.repeat(value, repeat, axis=0)
+                          for key, value in orbit_constants(df, ts).items()}
+
+    def _at(self, t):
+        # t muss einen Zeitpunkt pro (wiederholter) Bahn enthalten (siehe process_asteroid_batch)
+        helio_pos, helio_vel = heliocentric_positions(self.df, self.ts, t, with_velocity=True,
+                                                      constants=self.constants)
+        sun_pos, sun_vel, _, _ = self.sun._at(t)
+        return helio_pos.T + sun_pos, helio_vel.T + sun_vel, None, None
+
+def comet_orbit_constants(df, ts):
+    """
+    Zeitunabhängige Größen aller Kometenbahnen aus mpc.load_comets_dataframe():
+    Periheldistanz q, Exzentrizität e, Periheldurchgang (TT) und die Achsen P, Q wie bei
+    orbit_constants(). Elliptische, parabolische und hyperbolische Bahnen sind erlaubt.
+    """
+    P, Q = orbit_axes(df['inclination_degrees'].to_numpy(dtype=float),
+                      df['longitude_of_ascending_node_degrees'].to_numpy(dtype=float),
+                      df['argument_of_perihelion_degrees'].to_numpy(dtype=float))
+    perihelion_tt = ts.tt(df['perihelion_year'].to_numpy(dtype=float),
+                          df['perihelion_month'].to_numpy(dtype=float),
+                          df['perihelion_day'].to_numpy(dtype=float)).tt
+    return {
+        'q': df['perihelion_distance_au'].to_numpy(dtype=float),
+        'e': df['eccentricity'].to_numpy(dtype=float),
+        'perihelion_tt': np.atleast_1d(perihelion_tt),
+        'P': P,
+        'Q': Q,
+    }
+
+def _kepler_hyperbolic(M, e, iterations=50):
+    """
+    Löst e sinh H - H = M (e > 1) für ganze Arrays per Newton-Verfahren mit dem
+    Startwert H0 = sign(M) ln(2|M|/e + 1.8) nach Danby; die Iteration endet, sobald alle
+    Einträge auf Maschinengenauigkeit konvergiert sind.
+    """
+    H = np.sign(M) * np.log(2.0 * np.abs(M) / e + 1.8)
+    for _ in range(iterations):
+        step = (e * np.sinh(H) - H - M) / (e * np.cosh(H) - 1.0)
+        H = H - step
+        if not (np.abs(step) > 1e-14 * np.maximum(1.0, np.abs(H))).any():
+            break
+    return H
+
+def comet_heliocentric_positions(t, constants):
+    """
+    Heliozentrische ICRS-Positionen (N, 3) in AU und Geschwindigkeiten (N, 3) in AU/Tag
+    aller Kometen zu je einem Zeitpunkt pro Bahn (oder einem gemeinsamen Zeitpunkt t):
+    elliptisch über Markleys Kepler-Löser, hyperbolisch über e sinh H - H = M und
+    parabolisch geschlossen über die Barker-Gleichung.
+    """
+    q, e = constants['q'], constants['e']
+    dt = np.broadcast_to(t.tt - constants['perihelion_tt'], q.shape)
+    x, y, vx, vy = (np.full(q.shape, np.nan) for _ in range(4))
+
+    elliptic = e < 1.0
+    if elliptic.any():
+        ee, a = e[elliptic], q[elliptic] / (1.0 - e[elliptic])
+        n = np.sqrt(GM_SUN_AU3_D2 / a ** 3)
+        E = solve_kepler(n * dt[elliptic], ee)
+        cos_E, sin_E = np.cos(E), np.sin(E)
+        b = a * np.sqrt(1.0 - ee * ee)
+        E_dot = n / (1.0 - ee * cos_E)
+        x[elliptic], y[elliptic] = a * (cos_E - ee), b * sin_E
+        vx[elliptic], vy[elliptic] = -a * sin_E * E_dot, b * cos_E * E_dot
+
+    hyperbolic = e > 1.0
+    if hyperbolic.any():
+        ee, a = e[hyperbolic], q[hyperbolic] / (e[hyperbolic] - 1.0)
+        n = np.sqrt(GM_SUN_AU3_D2 / a ** 3)
+        H = _kepler_hyperbolic(n * dt[hyperbolic], ee)
+        cosh_H, sinh_H = np.cosh(H), np.sinh(H)
+        b = a * np.sqrt(ee * ee - 1.0)
+        H_dot = n / (ee * cosh_H - 1.0)
+        x[hyperbolic], y[hyperbolic] = a * (ee - cosh_H), b * sinh_H
+        vx[hyperbolic], vy[hyperbolic] = -a * sinh_H * H_dot, b * cosh_H * H_dot
+
+    parabolic = e == 1.0
+    if parabolic.any():
+        qq = q[parabolic]
+        k = np.sqrt(GM_SUN_AU3_D2 / (2.0 * qq ** 3))
+        # Barker: s + s^3/3 = k dt mit s = tan(v/2); über |B| lösen, um Auslöschung zu vermeiden
+        B = 1.5 * k * dt[parabolic]
+        Y = np.cbrt(np.abs(B) + np.sqrt(B * B + 1.0))
+        s_ = np.sign(B) * (Y - 1.0 / Y)
+        s_dot = k / (1.0 + s_ * s_)
+        x[parabolic], y[parabolic] = qq * (1.0 - s_ * s_), 2.0 * qq * s_
+        vx[parabolic], vy[parabolic] = -2.0 * qq * s_ * s_dot, 2.0 * qq * s_dot
+
+    position = constants['P'] * x[:, None]
+    position += constants['Q'] * y[:, None]
+    velocity = constants['P'] * vx[:, None]
+    velocity += constants['Q'] * vy[:, None]
+    return position, velocity
+
+class CometOrbitBatch(VectorFunction):
+    """
+    Alle Kometen eines DataFrames aus mpc.load_comets_dataframe() als eine Skyfield-Vektorfunktion
+    vom Baryzentrum aus, wie KeplerOrbitBatch. Mit repeat=M steht jede Bahn M-mal hintereinander.
+    """
+    center = 0
+
+    def __init__(self, df, ts, sun, target='CometEls', repeat=1, constants=None):
+        self.sun = sun
+        self.target = target
+        self.ephemeris = getattr(sun, 'ephemeris', None)
+        constants = constants if constants is not None else comet_orbit_constants(df, ts)
+        self.constants = {key: np.repeat(value, repeat, axis=0) for key, value in constants.items()}
+
+    def _at(self, t):
+        # t muss einen Zeitpunkt pro (wiederholter) Bahn enthalten
+        helio_pos, helio_vel = comet_heliocentric_positions(t, self.constants)
+        sun_pos, sun_vel, _, _ = self.sun._at(t)
+        return helio_pos.T + sun_pos, helio_vel.T + sun_vel, None, None
+
+class DownloadProgress:
+    """
+    Reicht read()-Aufrufe an die HTTP-Antwort durch und meldet den Fortschritt in 5-%-Schritten.
+    """
+    def __init__(self, response, file_size):
+        self.response = response
+        self.file_size = file_size
+        self.downloaded = 0
+        self.next_report = file_size / 20
+
+    def read(self, size=-1):
+        buffer = self.response.read(size)
+        self.downloaded += len(buffer)
+        if buffer and self.file_size and self.downloaded >= self.next_report:
+            print(f"Downloaded: {self.downloaded / (1024*1024):.1f} MB ({self.downloaded * 100 / self.file_size:.1f}%)")
+            while self.next_report <= self.downloaded:
+                self.next_report += self.file_size / 20
+        return buffer
+
+def file_stat(path):
+    """
+    os.stat() einer Cache-Datei oder None, wenn sie fehlt: Existenz, Alter und Größe
+    ergeben sich so aus einem einzigen Systemaufruf.
+    """
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+def savez_atomic(path, **arrays):
+    """
+    np.savez() in eine temporäre Datei im Zielverzeichnis, die anschließend per os.replace()
+    an ihren Platz kommt: Leser sehen so entweder den alten oder den vollständigen neuen Cache,
+    nie eine halb geschriebene Datei (Abbruch beim Schreiben, gleichzeitige Anfragen).
+    """
+    directory = os.path.dirname(path) or '.'
+    # Das Cache-Verzeichnis erst beim Schreiben anlegen, nicht schon beim Import
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
     try:
-        alpha = math.radians(phase_angle_deg)
-        tan_half = math.tan(alpha / 2.0)
-        # Phase functions
-        phi1 = math.exp(-3.33 * (tan_half ** 0.63))
-        phi2 = math.exp(-1.87 * (tan_half ** 1.22))
-        # Avoid log of zero
-        flux_term = max((1.0 - float(G)) * phi1 + float(G) * phi2, 1e-12)
-        value = float(H) + 5.0 * math.log10(max(r * delta, 1e-12)) - 2.5 * math.log10(flux_term)
-        return value
-    except Exception:
-        # Conservative fallback if anything goes wrong
-        return float(H) + 5.0 * math.log10(max(r * delta, 1e-12))
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def read_mpcorb_last_modified():
+    """
+    Liefert den Last-Modified-Header des letzten Downloads oder, falls keiner gespeichert ist,
+    die Änderungszeit der lokalen Datei im HTTP-Datumsformat.
+    """
+    if os.path.exists(MPCORB_LAST_MODIFIED_FILE):
+        with open(MPCORB_LAST_MODIFIED_FILE, 'r') as f:
+            last_modified = f.read().strip()
+        if last_modified:
+            return last_modified
+    return email.utils.formatdate(os.path.getmtime(MPCORB_FILE), usegmt=True)
+
+def mpcorb_update_due():
+    """
+    Prüft, ob seit der letzten Aktualisierungsprüfung mehr als MPCORB_CHECK_INTERVAL_HOURS vergangen sind.
+    """
+    marker = file_stat(MPCORB_LAST_MODIFIED_FILE) or os.stat(MPCORB_FILE)
+    return time.time() - marker.st_mtime > MPCORB_CHECK_INTERVAL_HOURS * 3600
 
 def download_mpcorb_file():
     """
-    Lädt die MPCORB.DAT.gz-Datei von der Minor Planet Center-Website herunter
+    Lädt die MPCORB.DAT.gz-Datei von der Minor Planet Center-Website herunter.
+    Ist bereits eine Datei vorhanden, wird per If-Modified-Since nur eine neuere Version übertragen.
     """
     try:
         print(f"Downloading MPCORB.DAT.gz from {MPCORB_URL}...")
         # Stelle sicher, dass das Verzeichnis existiert
         os.makedirs(os.path.dirname(MPCORB_FILE), exist_ok=True)
-        
+
+        request = urllib.request.Request(MPCORB_URL)
+        if os.path.exists(MPCORB_FILE):
+            request.add_header('If-Modified-Since', read_mpcorb_last_modified())
+
         # Datei herunterladen mit Fortschrittsanzeige
         print("Starting download...")
-        with urllib.request.urlopen(MPCORB_URL) as response, open(MPCORB_FILE, 'wb') as out_file:
+        try:
+            response = urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT_SECONDS)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                print("MPCORB.DAT.gz is up to date (304 Not Modified)")
+                # Zeitpunkt der Prüfung festhalten, ohne MPCORB.DAT.gz (und damit den Elemente-Cache) anzufassen
+                with open(MPCORB_LAST_MODIFIED_FILE, 'a'):
+                    os.utime(MPCORB_LAST_MODIFIED_FILE)
+                return True
+            raise
+
+        # Erst in eine Teildatei schreiben, damit ein Abbruch die vorhandene Datei nicht zerstört
+        partial_file = MPCORB_FILE + '.part'
+        with response, open(partial_file, 'wb') as out_file:
             file_size = int(response.info().get('Content-Length', 0))
             print(f"File size: {file_size / (1024*1024):.1f} MB")
-            
-            downloaded = 0
-            block_size = 8192
-            while True:
-                buffer = response.read(block_size)
-                if not buffer:
-                    break
-                    
-                downloaded += len(buffer)
-                out_file.write(buffer)
-                
-                # Fortschritt alle 1MB anzeigen
-                if downloaded % (1024*1024) < block_size:
-                    print(f"Downloaded: {downloaded / (1024*1024):.1f} MB ({downloaded * 100 / file_size:.1f}%)")
-        
-        print(f"Download complete. File saved to {MPCORB_FILE}")
-        
+            # In 1-MiB-Blöcken kopieren, Fortschritt nur in 5-%-Schritten ausgeben
+            shutil.copyfileobj(DownloadProgress(response, file_size), out_file, length=DOWNLOAD_BLOCK_SIZE)
+            last_modified = response.headers.get('Last-Modified', '')
+
         # Überprüfe, ob die Datei korrekt heruntergeladen wurde
-        if os.path.exists(MPCORB_FILE) and os.path.getsize(MPCORB_FILE) > 0:
+        if os.path.getsize(partial_file) > 0:
+            os.replace(partial_file, MPCORB_FILE)
+            with open(MPCORB_LAST_MODIFIED_FILE, 'w') as f:
+                f.write(last_modified)
+            print(f"Download complete. File saved to {MPCORB_FILE}")
             print(f"File size: {os.path.getsize(MPCORB_FILE) / (1024*1024):.1f} MB")
             return True
         else:
-            print("Download failed: File is empty or does not exist")
+            os.remove(partial_file)
+            print("Download failed: File is empty")
             return False
     except Exception as e:
         print(f"Error downloading MPCORB.DAT.gz: {e}")
         return False
-    return True
+
+def _parse_float_column(raw):
+    """
+    Wandelt eine Spalte aus Byte-Strings in float64 um; leere Felder werden NaN.
+    """
+    raw = np.char.strip(raw)
+    try:
+        return np.where(raw == b'', b'nan', raw).astype(np.float64)
+    except ValueError:
+        # Unerwarteter Inhalt: wie pd.to_numeric(errors='coerce') zu NaN machen
+        return pd.to_numeric(pd.Series(raw.astype(str)), errors='coerce').to_numpy(dtype=np.float64)
+
+def parse_mpcorb(f, max_rows=MAX_ASTEROIDS, max_absolute_magnitude=None):
+    """
+    Parst die ersten max_rows nicht-leeren Zeilen von MPCORB.DAT ohne pandas.read_fwf:
+    die Datensätze werden zu einem (N, MPCORB_RECORD_LENGTH) uint8-Array zusammengefügt
+    und jede Spalte wird als Byte-Slice am Stück umgewandelt.
+    Mit max_absolute_magnitude wird zuerst nur H umgewandelt und alle übrigen Spalten
+    nur noch für Zeilen mit H < max_absolute_magnitude.
+    Der Index entspricht wie bei mpc.load_mpcorb_dataframe() der Zeilennummer ohne Leerzeilen.
+    """
+    lines = []
+    for line in f:
+        if line.strip():
+            lines.append(line)
+            if len(lines) >= max_rows:
+                break
+
+    # Kopfzeilen bis einschließlich der Trennlinie aus Bindestrichen enthalten keine Bahnen.
+    # Die Trennlinie wird im zusammengefügten Block per bytes.find (C-Ebene) gesucht,
+    # ihr Zeilenindex ergibt sich aus der Zahl der Zeilenumbrüche davor.
+    block = b''.join(lines)
+    if block.startswith(b'-----'):
+        dashes = 0
+    else:
+        dashes = block.find(b'\n-----')
+        dashes = dashes + 1 if dashes >= 0 else -1
+    first, body_start = 0, 0
+    if dashes >= 0:
+        first = block.count(b'\n', 0, dashes) + 1
+        line_end = block.find(b'\n', dashes)
+        body_start = line_end + 1 if line_end >= 0 else len(block)
+
+    body = lines[first:]
+    table = None
+    # Im Normalfall sind alle Datensätze gleich lang: dann ohne Python-Schleife direkt
+    # als (N, MPCORB_RECORD_LENGTH + 1)-Array lesen und nur die Zeilenenden abschneiden
+    if len(block) - body_start == len(body) * (MPCORB_RECORD_LENGTH + 1):
+        table = np.frombuffer(block, dtype=np.uint8, offset=body_start).reshape(-1, MPCORB_RECORD_LENGTH + 1)
+        table = table[:, :MPCORB_RECORD_LENGTH] if (table[:, -1] == ord('\n')).all() else None
+    if table is None:
+        records = b''.join(
+            line.rstrip(b'\r\n').ljust(MPCORB_RECORD_LENGTH)[:MPCORB_RECORD_LENGTH]
+            for line in body
+        )
+        table = np.frombuffer(records, dtype=np.uint8).reshape(-1, MPCORB_RECORD_LENGTH)
+
+    def column(col):
+        start, end = MPCORB_COLUMN_SPECS[col]
+        raw = np.ascontiguousarray(table[:, start:end]).view(f'S{end - start}').ravel()
+        if col in MPCORB_TEXT_COLUMNS:
+            return np.char.strip(raw).astype(str)
+        return _parse_float_column(raw)
+
+    index = np.arange(first, len(lines))
+    columns = {}
+    if max_absolute_magnitude is not None:
+        # Billiger Filter zuerst: zu lichtschwache Zeilen werden gar nicht weiter umgewandelt
+        H = column('magnitude_H')
+        keep = H < max_absolute_magnitude
+        table, index = table[keep], index[keep]
+        columns['magnitude_H'] = H[keep]
+    for col in MPCORB_COLUMN_SPECS:
+        if col not in columns:
+            columns[col] = column(col)
+    return pd.DataFrame({col: columns[col] for col in MPCORB_COLUMN_SPECS}, index=index)
+
+def save_elements_cache(df, max_absolute_magnitude=np.inf):
+    """
+    Speichert die Bahnelemente spaltenweise (Structure of Arrays) als NumPy-Archiv,
+    damit beim nächsten Laden weder dekomprimiert noch Text geparst werden muss.
+    Die Zeilen werden nach H sortiert abgelegt (NaN am Ende), damit load_elements_cache()
+    die H-Grenze per Binärsuche statt per Maske anwenden kann.
+    max_absolute_magnitude ist die H-Grenze, mit der df bereits beim Parsen gefiltert wurde.
+    """
+    order = np.argsort(df['magnitude_H'].to_numpy(dtype=np.float64), kind='stable')
+    df = df.iloc[order]
+    arrays = {col: df[col].to_numpy(dtype=np.float64) for col in MPCORB_NUMERIC_COLUMNS}
+    for col in MPCORB_TEXT_COLUMNS:
+        arrays[col] = df[col].astype(str).to_numpy(dtype=str)
+    arrays['index'] = df.index.to_numpy()
+    arrays['sorted_by_magnitude_H'] = np.array(True)
+    arrays['max_absolute_magnitude'] = np.array(max_absolute_magnitude, dtype=np.float64)
+    savez_atomic(MPCORB_ELEMENTS_CACHE_FILE, **arrays)
+
+def load_elements_cache(max_absolute_magnitude=MAX_ABSOLUTE_MAGNITUDE):
+    """
+    Lädt die gecachten Bahnelemente und baut daraus wieder einen DataFrame auf.
+    Zeilen mit H >= max_absolute_magnitude (oder ohne H) werden bereits auf Array-Ebene verworfen:
+    bei nach H sortierten Caches per np.searchsorted als zusammenhängender Anfang, sonst per Maske.
+    Gibt None zurück, wenn der Cache mit einer engeren H-Grenze erstellt wurde.
+    """
+    with np.load(MPCORB_ELEMENTS_CACHE_FILE) as data:
+        if 'max_absolute_magnitude' in data.files and data['max_absolute_magnitude'] < max_absolute_magnitude:
+            return None
+        H = data['magnitude_H']
+        if 'sorted_by_magnitude_H' in data.files:
+            rows = slice(0, np.searchsorted(H, max_absolute_magnitude, side='left'))
+        else:
+            rows = H < max_absolute_magnitude
+        columns = {col: data[col][rows] for col in MPCORB_TEXT_COLUMNS + MPCORB_NUMERIC_COLUMNS}
+        return pd.DataFrame(columns, index=data['index'][rows])
+
+def save_bright_asteroid_cache(asteroid_list, rows, lat, lon, elevation, max_magnitude):
+    """
+    Speichert die Ergebnisliste spaltenweise als NumPy-Archiv, zusammen mit den Bahnelementen
+    der Asteroiden (rows) und dem Schlüssel aus Standort und Helligkeitsgrenze.
+    Zeitabhängige Positionen werden beim Laden neu berechnet.
+    """
+    arrays = {}
+    for field in BRIGHT_ASTEROID_FIELDS:
+        if field in BRIGHT_ASTEROID_TEXT_FIELDS:
+            arrays[field] = np.array([a[field] or '' for a in asteroid_list], dtype=str)
+        else:
+            arrays[field] = np.array([a[field] for a in asteroid_list], dtype=np.float64)
+    rows = rows.loc[[int(a['number']) for a in asteroid_list]]
+    for col in MPCORB_NUMERIC_COLUMNS:
+        arrays[col] = rows[col].to_numpy(dtype=np.float64)
+    for col in MPCORB_TEXT_COLUMNS:
+        arrays[col] = rows[col].astype(str).to_numpy(dtype=str)
+    # Ungerundete Helligkeit für die Maske in load_bright_asteroid_cache(); 'magnitude' ist gerundet
+    arrays['apparent_magnitude'] = rows['apparent_magnitude'].to_numpy(dtype=np.float64)
+    arrays['cache_key'] = np.array([lat, lon, elevation, max_magnitude], dtype=np.float64)
+    savez_atomic(BRIGHT_ASTEROID_CACHE_FILE, **arrays)
+
+def load_bright_asteroid_cache(ts, eph, lat, lon, elevation, max_magnitude=MAX_APPARENT_MAGNITUDE):
+    """
+    Lädt die gecachte Ergebnisliste und erzeugt daraus wieder die Dicts für die API.
+    Einträge heller als max_magnitude werden per Maske auf den Arrays ausgewählt,
+    RA/Dec, Alt/Az und Entfernung für den aktuellen Zeitpunkt in einem Aufruf neu berechnet.
+    Gibt None zurück, wenn der Cache für einen anderen Standort oder eine engere
+    Helligkeitsgrenze erstellt wurde.
+    """
+    with np.load(BRIGHT_ASTEROID_CACHE_FILE) as data:
+        # Caches ohne Schlüssel oder ohne ungerundete Helligkeit (ältere Versionen) neu aufbauen
+        if 'cache_key' not in data.files or 'apparent_magnitude' not in data.files:
+            return None
+        cached_lat, cached_lon, cached_elevation, cached_max_magnitude = data['cache_key']
+        if (not np.allclose([cached_lat, cached_lon, cached_elevation], [lat, lon, elevation])
+                or max_magnitude > cached_max_magnitude):
+            return None
+        mask = data['apparent_magnitude'] <= max_magnitude
+        columns = {field: data[field][mask] for field in BRIGHT_ASTEROID_FIELDS}
+        rows = pd.DataFrame(
+            {col: data[col][mask] for col in MPCORB_TEXT_COLUMNS + MPCORB_NUMERIC_COLUMNS},
+            index=columns['number'].astype(int),
+        )
+
+    if len(rows):
+        topos = location_topos(lat, lon, elevation)
+        positions = apparent_positions(rows, ts, eph['earth'] + topos, eph['sun'], ts.now())
+        for field, values in zip(BRIGHT_ASTEROID_POSITION_FIELDS, positions):
+            columns[field] = values
+        columns['distance'] = np.round(columns['distance'], 3)
+
+    # Leere Texte (fehlende Ereignisse) spaltenweise wieder zu None machen
+    return asteroid_dicts({
+        field: [value or None for value in columns[field].tolist()] if field in BRIGHT_ASTEROID_TEXT_FIELDS
+        else columns[field].tolist()
+        for field in BRIGHT_ASTEROID_FIELDS
+    })
+
+def asteroid_dicts(columns):
+    """
+    Erzeugt aus spaltenweisen Ergebnissen (Feld -> Liste, Reihenfolge wie BRIGHT_ASTEROID_FIELDS)
+    die Dicts der API. Alle Berechnungen bleiben bis hierhin spaltenweise; Dicts entstehen
+    erst an dieser einen Stelle.
+    """
+    return [
+        dict(zip(BRIGHT_ASTEROID_FIELDS, values), type="asteroid", symbol="•")
+        for values in zip(*(columns[field] for field in BRIGHT_ASTEROID_FIELDS))
+    ]
+
+def apparent_positions(rows, ts, observer, sun, t):
+    """
+    Scheinbare RA/Dec, Alt/Az (Grad) und Entfernung (AU) aller Zeilen zum Zeitpunkt t
+    in einem observe()-Aufruf. t wird pro Asteroid wiederholt, damit Lichtlaufzeit
+    und Ablenkung elementweise rechnen.
+    """
+    t_rows = ts.tt_jd(np.full(len(rows), t.whole), np.full(len(rows), t.tt_fraction))
+    apparent = observer.at(t_rows).observe(KeplerOrbitBatch(rows, ts, sun)).apparent()
+    ra, dec, distance = apparent.radec()
+    alt, az, _ = apparent.altaz()
+    return ra.hours * 15.0, dec.degrees, alt.degrees, az.degrees, distance.au
+
+def process_asteroid_batch(rows, ts, eph, t, lat, lon, elevation):
+    """
+    Berechnet Position, Entfernung und Aufgangs-/Untergangs-/Transitzeiten
+    für einen Teil der hellen Asteroiden und gibt die Ergebnis-Dicts zurück.
+    """
+    if rows.empty:
+        return []
+    topos = location_topos(lat, lon, elevation)
+    observer = eph['earth'] + topos
+    sun = eph['sun']
+
+    # Suchfenster ab lokaler Mitternacht wie bei den Kometen, damit das 48h-Gitter den ganzen
+    # lokalen Tag abdeckt: dasselbe Zeitgitter für jeden Asteroiden (vektorisierte
+    # TT-JD-Arithmetik statt datetime/timedelta)
+    local_midnight = t.utc_datetime().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    start_time = ts.from_datetime(local_midnight)
+    step_days = RISE_SET_STEP_MINUTES / 1440.0
+    offsets = np.arange(int(round(RISE_SET_WINDOW_DAYS / step_days)) + 1) * step_days
+    time_grid = ts.tt_jd(start_time.whole, start_time.tt_fraction + offsets)
+    local_day = local_day_tt(ts)
+
+    # Altitude und Stundenwinkel aller Asteroiden über das ganze Suchfenster in
+    # einem observe()-Aufruf: Zeile k des (N, M)-Ergebnisses ist das Gitter von Asteroid k
+    n_grid = len(offsets)
+    grid_times = ts.tt_jd(np.full(len(rows) * n_grid, start_time.whole),
+                          np.tile(start_time.tt_fraction + offsets, len(rows)))
+    # Die Nutation (IAU 2000A) ist der teuerste Teil der Erdrotation: nur für die M
+    # verschiedenen Gitterzeiten berechnen und wiederholen, wie es almanac.py mit IAU 2000B tut
+    grid_times._nutation_angles_radians = tuple(
+        np.tile(angle, len(rows)) for angle in time_grid._nutation_angles_radians
+    )
+    grid = observer.at(grid_times).observe(KeplerOrbitBatch(rows, ts, sun, repeat=n_grid)).apparent()
+    grid_altitudes = grid.altaz()[0].degrees.reshape(len(rows), n_grid)
+    grid_hour_angles = grid.hadec()[0].hours.reshape(len(rows), n_grid)
+
+    events = []
+    failures = []
+    for designation, altitudes, hour_angles in zip(rows['designation'], grid_altitudes, grid_hour_angles):
+        try:
+            events.append(find_horizon_events(time_grid, altitudes, hour_angles, local_day=local_day))
+        except Exception as e:
+            events.append(None)
+            failures.append(f"{designation}: {e}")
+    if failures:
+        # Eine Zusammenfassung statt einer Ausgabe pro Asteroid
+        print(f"Error in final processing for {len(failures)} asteroids, first: {failures[0]}")
+    keep = np.array([event is not None for event in events], dtype=bool)
+    events = [event for event in events if event is not None]
+
+    # Scheinbare Positionen zum Zeitpunkt t für alle Asteroiden in einem observe()-Aufruf
+    ra_deg, dec_deg, alt_deg, az_deg, distance_au = (
+        values[keep] for values in apparent_positions(rows, ts, observer, sun, t)
+    )
+    return asteroid_dicts({
+        'name': rows['designation'].to_numpy()[keep].tolist(),
+        'number': [str(number) for number in rows.index[keep]],
+        'magnitude': [round(m, 1) for m in rows['apparent_magnitude'].to_numpy(dtype=float)[keep].tolist()],
+        'ra': ra_deg.tolist(), 'dec': dec_deg.tolist(),
+        'altitude': alt_deg.tolist(), 'azimuth': az_deg.tolist(),
+        'distance': [round(d, 3) for d in distance_au.tolist()],
+        'rise_time': [format_time(event[0]) for event in events],
+        'set_time': [format_time(event[1]) for event in events],
+        'transit_time': [format_time(event[2]) for event in events],
+    })
+
+def _process_asteroid_batch_worker(rows, t_whole, t_tt_fraction, lat, lon, elevation, eph_path):
+    """
+    Einstiegspunkt für Worker-Prozesse: Zeitskala und Ephemeride werden im Worker neu geladen.
+    """
+    ts = load.timescale()
+    eph = load_file(eph_path)
+    t = ts.tt_jd(t_whole, t_tt_fraction)
+    return process_asteroid_batch(rows, ts, eph, t, lat, lon, elevation)
+
+def compute_bright_asteroid_details(rows, ts, eph, t, lat, lon, elevation):
+    """
+    Verteilt die Detailberechnung auf einen ProcessPoolExecutor, sobald die Liste
+    groß genug ist, dass sich der Start der Worker lohnt; sonst seriell.
+    """
+    workers = min(os.cpu_count() or 1, len(rows) // PARALLEL_MIN_BATCH_SIZE)
+    eph_path = getattr(eph, 'path', None)
+    if workers > 1 and eph_path:
+        # Zusammenhängende Teilstücke, damit die Sortierung nach Helligkeit erhalten bleibt
+        shards = [rows.iloc[positions] for positions in np.array_split(np.arange(len(rows)), workers)]
+        worker = partial(
+            _process_asteroid_batch_worker, t_whole=t.whole, t_tt_fraction=t.tt_fraction,
+            lat=lat, lon=lon, elevation=elevation, eph_path=eph_path
+        )
+        try:
+            # Worker nicht per fork starten: fork aus einem Thread-Prozess erbt gehaltene Sperren
+            # (ASTEROID_LOCK, Numbas Threadpool) in einem Zustand, der im Kind nie freigegeben wird
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context(start_method)) as executor:
+                return [asteroid for batch in executor.map(worker, shards) for asteroid in batch]
+        except Exception as e:
+            print(f"Parallel asteroid processing failed, falling back to serial: {e}")
+    return process_asteroid_batch(rows, ts, eph, t, lat, lon, elevation)
 
 def load_bright_asteroids(loader, ts, eph, observer_location, max_magnitude=MAX_APPARENT_MAGNITUDE, use_cache=True):
     """
@@ -130,49 +1032,68 @@ def load_bright_asteroids(loader, ts, eph, observer_location, max_magnitude=MAX_
 
     print(f"Getting asteroids with magnitude <= {max_magnitude} at lat={lat}, lon={lon}, elevation={elevation}.")
 
+    # Cache-Prüfung, Download und Neuaufbau jeweils nur in einer Anfrage gleichzeitig; wartende
+    # Anfragen finden danach den frisch geschriebenen Cache
+    with ASTEROID_LOCK:
+        return _load_bright_asteroids(ts, eph, lat, lon, elevation, max_magnitude, use_cache)
+
+def _load_bright_asteroids(ts, eph, lat, lon, elevation, max_magnitude, use_cache):
+    """
+    Rumpf von load_bright_asteroids() unter ASTEROID_LOCK: Ergebnis-Cache, MPCORB-Download,
+    Elemente-Cache und Berechnung.
+    """
     # Check for final cached asteroid list
-    if use_cache and os.path.exists(BRIGHT_ASTEROID_CACHE_FILE):
-        cache_age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(BRIGHT_ASTEROID_CACHE_FILE))
-        if cache_age.total_seconds() < CACHE_VALIDITY_HOURS * 3600:
-            print(f"Loading {BRIGHT_ASTEROID_CACHE_FILE} (valid cache)")
-            with open(BRIGHT_ASTEROID_CACHE_FILE, 'rb') as f:
-                return pickle.load(f)
+    cache_stat = file_stat(BRIGHT_ASTEROID_CACHE_FILE) if use_cache else None
+    if cache_stat is not None and cache_stat.st_size > 0:
+        if time.time() - cache_stat.st_mtime < CACHE_VALIDITY_HOURS * 3600:
+            try:
+                cached = load_bright_asteroid_cache(ts, eph, lat, lon, elevation, max_magnitude)
+            except Exception as e:
+                # Unlesbarer Cache (z.B. abgebrochener Schreibvorgang) gilt als Fehltreffer
+                print(f"Bright asteroid cache is unreadable: {e}")
+            else:
+                if cached is not None:
+                    print(f"Loading {BRIGHT_ASTEROID_CACHE_FILE} (valid cache)")
+                    return cached
+                print("Bright asteroid cache was built for another location or magnitude limit.")
         else:
             print("Bright asteroid cache is too old.")
 
     # --- DataFrame Loading --- 
     df = None
-    # Always re-parse for now to avoid complex cache validation logic
-    force_reload = True 
-    if not force_reload and os.path.exists(ASTEROID_DF_CACHE_FILE):
-        print(f"Loading asteroid DataFrame from cache: {ASTEROID_DF_CACHE_FILE}")
-        with open(ASTEROID_DF_CACHE_FILE, 'rb') as f:
-            df = pickle.load(f)
-    else:
-        if not os.path.exists(MPCORB_FILE):
-            if not download_mpcorb_file():
-                return []
+    if file_stat(MPCORB_FILE) is None:
+        if not download_mpcorb_file():
+            return []
+    elif mpcorb_update_due():
+        # Bedingter Download: bei 304 bleibt die vorhandene Datei samt Elemente-Cache gültig
+        download_mpcorb_file()
+
+    # Geparste Bahnelemente wiederverwenden, solange MPCORB.DAT.gz nicht neuer ist
+    # (Stat erst nach einem möglichen Download, der die Änderungszeit neu setzt)
+    mpcorb_stat = file_stat(MPCORB_FILE)
+    elements_stat = file_stat(MPCORB_ELEMENTS_CACHE_FILE)
+    if (mpcorb_stat is not None and elements_stat is not None
+            and elements_stat.st_mtime >= mpcorb_stat.st_mtime):
+        print(f"Loading orbital elements from cache: {MPCORB_ELEMENTS_CACHE_FILE}")
+        try:
+            df = load_elements_cache()
+            if df is None:
+                print("Orbital element cache was built for a lower H limit.")
+        except Exception as e:
+            # Unlesbarer Cache (z.B. abgebrochener Schreibvorgang): MPCORB.DAT.gz neu parsen
+            print(f"Orbital element cache is unreadable, reparsing: {e}")
+            df = None
+    if df is None:
         try:
             print(f"Loading and parsing asteroid data from {MPCORB_FILE}...")
-            with gzip.open(MPCORB_FILE, 'rb') as f:
-                df = mpc.load_mpcorb_dataframe(f)
-            
-            df = df.iloc[:MAX_ASTEROIDS]
-            
-            # Convert types
-            numeric_cols = [
-                'magnitude_H', 'magnitude_G', 'mean_anomaly_degrees', 'argument_of_perihelion_degrees',
-                'longitude_of_ascending_node_degrees', 'inclination_degrees', 'eccentricity',
-                'mean_daily_motion_degrees', 'semimajor_axis_au'
-            ]
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
+            with open_mpcorb() as f:
+                df = parse_mpcorb(f, max_rows=MAX_ASTEROIDS, max_absolute_magnitude=MAX_ABSOLUTE_MAGNITUDE)
             df['magnitude_G'] = df['magnitude_G'].fillna(0.15)
 
-            with open(ASTEROID_DF_CACHE_FILE, 'wb') as f:
-                pickle.dump(df, f)
-            print(f"Saved {len(df)} asteroids to DataFrame cache.")
+            save_elements_cache(df, MAX_ABSOLUTE_MAGNITUDE)
+            print(f"Saved {len(df)} asteroids to orbital element cache.")
+            # H-Vorfilter vor jeder weiteren Berechnung, in derselben Reihenfolge wie aus dem Cache
+            df = load_elements_cache()
         except Exception as e:
             print(f"Error processing MPCORB data: {e}")
             return []
@@ -182,100 +1103,51 @@ def load_bright_asteroids(loader, ts, eph, observer_location, max_magnitude=MAX_
 
     # --- Calculations ---
     t = ts.now()
-    topos = Topos(latitude_degrees=lat, longitude_degrees=lon, elevation_m=elevation)
+    topos = location_topos(lat, lon, elevation)
     observer = eph['earth'] + topos
     sun = eph['sun']
     
     try:
-        df.dropna(subset=['magnitude_H'], inplace=True)
-        candidates_df = df[df['magnitude_H'] < MAX_ABSOLUTE_MAGNITUDE].copy()
+        # Der H-Vorfilter wurde bereits beim Laden der Bahnelemente angewendet
+        candidates_df = df
         print(f"Found {len(candidates_df)} candidates with H < {MAX_ABSOLUTE_MAGNITUDE}")
 
-        apparent_magnitudes = []
-        for index, row in candidates_df.iterrows():
-            try:
-                orbit = mpc.mpcorb_orbit(row, ts, gm_km3_s2=GM_SUN_Pitjeva_2005_km3_s2)
-                astrometric = observer.at(t).observe(sun + orbit)
-                # Distances
-                delta = astrometric.distance().au
-                sun_vec = sun.at(t).observe(sun + orbit)
-                r = sun_vec.distance().au
-                phase_angle = astrometric.phase_angle(sun).degrees
-                # Compute apparent magnitude using IAU H-G model
-                apparent_mag = asteroid_apparent_magnitude(
-                    H=row['magnitude_H'], G=row['magnitude_G'], r=r, delta=delta, phase_angle_deg=phase_angle
-                )
-                apparent_magnitudes.append(apparent_mag)
-            except Exception as e:
-                print(f"  - Error processing {row.get('designation', 'N/A')}: {e}")
-                apparent_magnitudes.append(float('inf'))
-        
-        candidates_df['apparent_magnitude'] = apparent_magnitudes
-        bright_df = candidates_df[candidates_df['apparent_magnitude'] <= max_magnitude].sort_values('apparent_magnitude')
-        top_df = bright_df.head(MAX_ASTEROIDS)
+        # Beobachter und Sonne sind für alle Asteroiden gleich: nur einmal für t auswerten
+        observer_at_t = observer.at(t)
+        observer_pos = observer_at_t.position.au
+        sun_pos = sun.at(t).position.au
+
+        # Heliozentrische Positionen aller Kandidaten in einem Array-Durchgang (N, 3)
+        helio_pos = heliocentric_positions(candidates_df, ts, t)
+
+        # Distanzen und Phasenwinkel für alle Kandidaten in einem vektorisierten Durchgang
+        observer_to_asteroid = helio_pos + (sun_pos - observer_pos)
+        # Beträge über je eine einsum-Summe ohne die Zwischenarrays von np.linalg.norm
+        delta = np.sqrt(np.einsum('ij,ij->i', observer_to_asteroid, observer_to_asteroid))
+        r = np.sqrt(np.einsum('ij,ij->i', helio_pos, helio_pos))
+        # Die Phasenfunktion braucht nur tan(alpha/2) = |a x b| / (|a| |b| + a . b): direkt aus
+        # Kreuz- und Skalarprodukt, ohne den Umweg über arctan2, Grad, Bogenmaß und tan
+        cross = np.cross(observer_to_asteroid, helio_pos)
+        dot = np.einsum('ij,ij->i', observer_to_asteroid, helio_pos)
+        tan_half_phase = np.sqrt(np.einsum('ij,ij->i', cross, cross)) / (delta * r + dot)
+
+        # Compute apparent magnitude using IAU H-G model for all candidates at once
+        apparent_magnitudes = asteroid_apparent_magnitude_vec(
+            H=candidates_df['magnitude_H'].to_numpy(), G=candidates_df['magnitude_G'].to_numpy(),
+            r=r, delta=delta, tan_half=tan_half_phase
+        )
+        # Ungültige Bahnen (NaN) wie bisher ans Ende sortieren
+        apparent_magnitudes = np.where(np.isfinite(apparent_magnitudes), apparent_magnitudes, np.inf)
+
+        # Auswahl und Sortierung auf den Arrays; nur die hellen Zeilen werden als DataFrame kopiert
+        bright = np.flatnonzero(apparent_magnitudes <= max_magnitude)
+        bright = bright[np.argsort(apparent_magnitudes[bright])][:MAX_ASTEROIDS]
+        top_df = candidates_df.iloc[bright].assign(apparent_magnitude=apparent_magnitudes[bright])
         print(f"Found {len(top_df)} asteroids with apparent mag <= {max_magnitude}")
 
-        asteroid_list = []
-        for index, row in top_df.iterrows():
-            try:
-                orbit = mpc.mpcorb_orbit(row, ts, gm_km3_s2=GM_SUN_Pitjeva_2005_km3_s2)
-                astrometric = observer.at(t).observe(sun + orbit)
-                apparent = astrometric.apparent()
-                ra, dec, distance = apparent.radec()
-                alt, az, _ = apparent.altaz()
-
-                start_time = ts.utc(t.utc_datetime().replace(hour=0, minute=0, second=0, microsecond=0))
-                end_time = ts.utc(start_time.utc_datetime() + timedelta(days=2))
-                rise_set_func = almanac.risings_and_settings(eph, sun + orbit, topos)
-                times, events = almanac.find_discrete(start_time, end_time, rise_set_func)
-                
-                rise_time, set_time = None, None
-                for ti, event in zip(times, events):
-                    if event == 1 and rise_time is None: rise_time = ti.utc_datetime()
-                    elif event == 0 and set_time is None: set_time = ti.utc_datetime()
-                
-                f = almanac.meridian_transits(eph, sun + orbit, topos)
-                t_times, t_events = almanac.find_discrete(start_time, end_time, f)
-                # Wähle die obere Kulmination (höchste Altitude) für den lokalen Tag
-                chosen_local_dt = None
-                if len(t_times):
-                    now_local = datetime.now().astimezone()
-                    today_local = now_local.date()
-                    candidates = []
-                    for ti, ev in zip(t_times, t_events):
-                        # UTC -> lokal
-                        utc_dt = ti.utc_datetime().replace(tzinfo=timezone.utc)
-                        local_dt = utc_dt.astimezone()
-                        # Altitude am Transit-Zeitpunkt bestimmen
-                        try:
-                            alt_deg = observer.at(ti).observe(sun + orbit).apparent().altaz()[0].degrees
-                        except Exception:
-                            alt_deg = float('-inf')
-                        candidates.append((local_dt, alt_deg, int(ev)))
-                    # Kandidaten auf heutigen lokalen Tag beschränken
-                    today_candidates = [c for c in candidates if c[0].date() == today_local]
-                    pool = today_candidates if today_candidates else candidates
-                    if pool:
-                        # Höchste Altitude zuerst, bei Gleichstand früheste Zeit
-                        pool.sort(key=lambda x: (-x[1], x[0]))
-                        chosen_local_dt = pool[0][0]
-                transit_time = chosen_local_dt
-
-                asteroid_list.append({
-                    "name": row['designation'], "number": str(row.name),
-                    "magnitude": round(float(row['apparent_magnitude']), 1),
-                    "ra": ra.hours * 15.0, "dec": dec.degrees,
-                    "altitude": alt.degrees, "azimuth": az.degrees,
-                    "distance": round(distance.au, 3), "rise_time": format_time(rise_time),
-                    "set_time": format_time(set_time), "transit_time": format_time(transit_time),
-                    "type": "asteroid", "symbol": "•"
-                })
-            except Exception as e:
-                print(f"Error in final processing for {row['designation']}: {e}")
-                continue
+        asteroid_list = compute_bright_asteroid_details(top_df, ts, eph, t, lat, lon, elevation)
 
-        with open(BRIGHT_ASTEROID_CACHE_FILE, 'wb') as f:
-            pickle.dump(asteroid_list, f)
+        save_bright_asteroid_cache(asteroid_list, top_df, lat, lon, elevation, max_magnitude)
         print(f"Saved {len(asteroid_list)} bright asteroids to cache.")
         
         return asteroid_list
@@ -1,15 +1,14 @@
 """
 AsciiSky - ASCII Art Himmelsdarstellung
 """
-import os
 import json
-import pickle
+import math
 import time
 import gzip
 import urllib.request
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Dict, List, Optional, Any
-from types import SimpleNamespace
 
 import numpy as np
 import pandas as pd
@@ -21,6 +20,7 @@ from skyfield import almanac
 from skyfield.api import load, wgs84, Star, Topos, Loader
 from skyfield.data import hipparcos, mpc
 from skyfield.magnitudelib import planetary_magnitude
+from skyfield.nutationlib import iau2000b_radians
 from starlette.responses import FileResponse
 
 import settings
@@ -46,12 +46,11 @@ eph = load('de421.bsp')  # Ephemeris-Datei
 # Cache für Kometendaten
 comet_data_cache = None
 comet_cache_timestamp = None
+# Bahnkonstanten zu comet_data_cache: (DataFrame, gültige Zeilen, Konstanten)
+comet_orbit_cache = None
 
 # Cache-Dateien
-COMET_CACHE_FILE = "cache/comet_cache.pkl"
-
-# Stellen Sie sicher, dass das Cache-Verzeichnis existiert
-os.makedirs("cache", exist_ok=True)
+COMET_CACHE_FILE = "cache/comet_cache.npz"
 
 # Planeten und andere Himmelskörper
 CELESTIAL_BODIES = {
@@ -81,13 +80,41 @@ BODY_SYMBOLS = {
     'comet': '☄️'
 }
 
+def moon_magnitude(phase_angle):
+    """
+    Mond-Magnitude und Phasenfaktor aus dem Phasenwinkel (Bogenmaß, almanac.moon_phase()).
+    Formel: M = -12.7 + 2.5 * log10(0.5 * (1 - cos(phase_angle)))
+    """
+    phase_factor = 0.5 * (1 - math.cos(phase_angle))
+    if phase_factor > 0:
+        return -12.7 + 2.5 * math.log10(phase_factor), phase_factor
+    return -12.7, phase_factor  # Fallback für Vollmond
+
+@lru_cache(maxsize=16)
+def observer_for_location(lat, lon, elevation):
+    """
+    Standort (wgs84) und Beobachter (Erde + Standort) für eine Position. Wiederholte Anfragen
+    vom selben Standort verwenden dieselben Skyfield-Objekte, statt sie jedes Mal neu aufzubauen.
+    """
+    location = wgs84.latlon(lat, lon, elevation_m=elevation)
+    return location, eph['earth'] + location
+
+@lru_cache(maxsize=64)
+def rise_set_function(body_id, lat, lon, elevation):
+    """
+    almanac.risings_and_settings() für einen Körper aus CELESTIAL_BODIES und einen Standort,
+    einmal aufgebaut und von weiteren Anfragen wiederverwendet.
+    """
+    location, _ = observer_for_location(lat, lon, elevation)
+    return almanac.risings_and_settings(eph, CELESTIAL_BODIES[body_id], location)
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """Render the main page."""
     return FileResponse("templates/index.html")
 
 @app.get(API_ENDPOINT_CELESTIAL)
-async def get_celestial_objects(lat: float = None, lon: float = None, elevation: float = None):
+def get_celestial_objects(lat: float = None, lon: float = None, elevation: float = None):
     """Get positions of celestial objects."""
     try:
         # Hole Standortdaten aus den Einstellungen, wenn nicht übergeben
@@ -100,8 +127,7 @@ async def get_celestial_objects(lat: float = None, lon: float = None, elevation:
             elevation = location_settings["elevation"]
         
         t = ts.now()
-        location = wgs84.latlon(lat, lon, elevation_m=elevation)
-        observer = eph['earth'] + location
+        _, observer = observer_for_location(lat, lon, elevation)
         
         result = {
             "time": t.utc_datetime().isoformat(),
@@ -114,16 +140,30 @@ async def get_celestial_objects(lat: float = None, lon: float = None, elevation:
             "loading": False
         }
         
+        # Beobachter und Erdmittelpunkt hängen nicht vom Himmelskörper ab: nur einmal auswerten
+        observer_at_t = observer.at(t)
+        earth_center = eph['earth'].at(t)
+
+        # Auf-/Untergänge aller Körper aus einem gemeinsamen Zeitgitter ab 00:00 UTC heute (48 Stunden):
+        # Beobachterposition und Erdrotation werden einmal für alle Gitterzeiten berechnet statt in
+        # einer find_discrete-Suche pro Körper; Nutation nach IAU 2000B wie in almanac.risings_and_settings
+        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        start_time = ts.from_datetime(today_start)
+        step_days = bright_asteroids.RISE_SET_STEP_MINUTES / 1440.0
+        offsets = np.arange(int(round(bright_asteroids.RISE_SET_WINDOW_DAYS / step_days)) + 1) * step_days
+        time_grid = ts.tt_jd(start_time.whole, start_time.tt_fraction + offsets)
+        time_grid._nutation_angles_radians = iau2000b_radians(time_grid)
+        observer_at_grid = observer.at(time_grid)
+
         # Berechne Position und Helligkeit für jeden Himmelskörper
         for name, body in CELESTIAL_BODIES.items():
             try:
                 # Berechne Position vom Beobachter aus
-                astrometric = observer.at(t).observe(body)
+                astrometric = observer_at_t.observe(body)
                 apparent = astrometric.apparent()
                 alt, az, distance = apparent.altaz()
                 
                 # Berechne Entfernung vom Erdmittelpunkt aus
-                earth_center = eph['earth'].at(t)
                 earth_to_body = earth_center.observe(body)
                 # Entfernung in astronomischen Einheiten (AU)
                 earth_distance = earth_to_body.distance().au
@@ -134,18 +174,8 @@ async def get_celestial_objects(lat: float = None, lon: float = None, elevation:
                     mag = -26.74  # Standardwert für die Sonne
                 elif name == 'moon':
                     # Berechne die Mondphase
-                    sun_astrometric = observer.at(t).observe(eph['sun'])
                     moon_phase = almanac.moon_phase(eph, t)
-                    moon_phase_angle = float(moon_phase.radians)
-                    
-                    # Berechne die Mond-Magnitude basierend auf der Phase
-                    # Formel: M = -12.7 + 2.5 * log10(0.5 * (1 - cos(phase_angle)))
-                    import math
-                    phase_factor = 0.5 * (1 - math.cos(moon_phase_angle))
-                    if phase_factor > 0:
-                        mag = -12.7 + 2.5 * math.log10(phase_factor)
-                    else:
-                        mag = -12.7  # Fallback für Vollmond
+                    mag, _ = moon_magnitude(float(moon_phase.radians))
                 elif name in ['mercury', 'venus', 'mars', 'jupiter', 'saturn']:
                     try:
                         mag = planetary_magnitude(astrometric)
@@ -170,53 +200,35 @@ async def get_celestial_objects(lat: float = None, lon: float = None, elevation:
                 
                 # Berechne Auf- und Untergangszeiten
                 try:
-                    f = almanac.risings_and_settings(eph, body, location)
-                    
-                    # Suche nach dem nächsten Aufgang
-                    t1 = ts.now()
-                    # Verwende UTC für die Zeitberechnung
-                    # Starte die Suche vom Beginn des aktuellen Tages (00:00 UTC)
-                    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-                    t1_start = ts.from_datetime(today_start)
-                    # Ende der Suche: 48 Stunden später (zwei volle Tage)
-                    t2 = ts.from_datetime(today_start + timedelta(days=2))
-                    times, events = almanac.find_discrete(t1_start, t2, f)
-                    
-                    rise_time = None
-                    set_time = None
-                    
-                    for time, event in zip(times, events):
-                        # Konvertiere UTC zu lokaler Zeit mit expliziter Zeitzone
-                        utc_time = time.utc_datetime().replace(tzinfo=timezone.utc)
-                        local_time = utc_time.astimezone()
-                        # Formatiere die Zeit als HH:MM
-                        formatted_time = local_time.strftime('%H:%M')
-                        # print(f"Converted time for {name}: {utc_time.strftime('%H:%M')} UTC -> {formatted_time} local ({local_time.tzinfo})")
-                        
-                        if event == 1:  # Aufgang
-                            rise_time = formatted_time
-                        else:  # Untergang
-                            set_time = formatted_time
+                    grid_altitudes = observer_at_grid.observe(body).apparent().altaz()[0].degrees
+                    rises, sets = bright_asteroids.horizon_crossings(time_grid, grid_altitudes)
+
+                    # Wie bisher jeweils das letzte Ereignis im Suchfenster, in lokaler Zeit
+                    rise_local = ts.tt_jd(rises[-1]).utc_datetime().astimezone() if rises else None
+                    set_local = ts.tt_jd(sets[-1]).utc_datetime().astimezone() if sets else None
+                    # Erst für die Ausgabe als HH:MM formatieren
+                    rise_time = rise_local.strftime('%H:%M') if rise_local else None
+                    set_time = set_local.strftime('%H:%M') if set_local else None
                             
                     # Berechne die Transitzeit (Kulmination)
                     transit_time = None
                     try:
                         # Wenn Auf- und Untergangszeit bekannt sind, suche im Zeitraum dazwischen
-                        if rise_time and set_time:
+                        if rise_local and set_local:
                             # Hole die aktuelle Zeit mit Zeitzone
                             now = datetime.now().astimezone()
                             local_tz = now.tzinfo
                             today = now.date()
                             
-                            # Konvertiere Zeiten zu Datetime-Objekten mit lokaler Zeitzone
-                            rise_dt = datetime.strptime(rise_time, '%H:%M').replace(
-                                year=today.year, month=today.month, day=today.day, tzinfo=local_tz)
-                            set_dt = datetime.strptime(set_time, '%H:%M').replace(
-                                year=today.year, month=today.month, day=today.day, tzinfo=local_tz)
+                            # Uhrzeiten (auf Minuten) auf den heutigen Tag mit lokaler Zeitzone legen
+                            rise_dt = rise_local.replace(year=today.year, month=today.month, day=today.day,
+                                                         second=0, microsecond=0, tzinfo=local_tz)
+                            set_dt = set_local.replace(year=today.year, month=today.month, day=today.day,
+                                                       second=0, microsecond=0, tzinfo=local_tz)
                             
                             # Wenn der Untergang vor dem Aufgang liegt, ist er am nächsten Tag
                             if set_dt < rise_dt:
-                                set_dt = set_dt.replace(day=today.day + 1)
+                                set_dt += timedelta(days=1)
                             
                             # Berechne die Mitte zwischen Auf- und Untergang als Näherung für die Transitzeit
                             transit_dt = rise_dt + (set_dt - rise_dt) / 2
@@ -258,7 +270,7 @@ async def get_celestial_objects(lat: float = None, lon: float = None, elevation:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get(f"{API_ENDPOINT_CELESTIAL}/{{body_id}}")
-async def get_celestial_object(body_id: str, lat: float = None, lon: float = None, elevation: float = None):
+def get_celestial_object(body_id: str, lat: float = None, lon: float = None, elevation: float = None):
     """Get position of a specific celestial object."""
     try:
         # Überprüfe, ob der angeforderte Körper existiert
@@ -275,13 +287,13 @@ async def get_celestial_object(body_id: str, lat: float = None, lon: float = Non
             elevation = location_settings["elevation"]
         
         t = ts.now()
-        location = wgs84.latlon(lat, lon, elevation_m=elevation)
-        observer = eph['earth'] + location
+        _, observer = observer_for_location(lat, lon, elevation)
         
         body = CELESTIAL_BODIES[body_id]
         
-        # Berechne Position vom Beobachter aus
-        astrometric = observer.at(t).observe(body)
+        # Berechne Position vom Beobachter aus (observer.at(t) nur einmal pro Anfrage)
+        observer_at_t = observer.at(t)
+        astrometric = observer_at_t.observe(body)
         apparent = astrometric.apparent()
         alt, az, distance = apparent.altaz()
         
@@ -297,21 +309,8 @@ async def get_celestial_object(body_id: str, lat: float = None, lon: float = Non
             mag = -26.74  # Standardwert für die Sonne
         elif body_id == 'moon':
             # Berechne die Mondphase
-            sun_astrometric = observer.at(t).observe(eph['sun'])
             moon_phase = almanac.moon_phase(eph, t)
-            moon_phase_angle = float(moon_phase.radians)
-            
-            # Berechne die Mond-Magnitude basierend auf der Phase
-            # Formel: M = -12.7 + 2.5 * log10(0.5 * (1 - cos(phase_angle)))
-            import math
-            phase_factor = 0.5 * (1 - math.cos(moon_phase_angle))
-            if phase_factor > 0:
-                mag = -12.7 + 2.5 * math.log10(phase_factor)
-            else:
-                mag = -12.7  # Fallback für Vollmond
-                
-            # Füge die Mondphase als Prozent zum Ergebnis hinzu
-            phase_percent = (1 - phase_factor * 2) * 100  # 0% = Neumond, 100% = Vollmond
+            mag, phase_factor = moon_magnitude(float(moon_phase.radians))
         elif body_id in ['mercury', 'venus', 'mars', 'jupiter', 'saturn']:
             try:
                 mag = planetary_magnitude(astrometric)
@@ -335,7 +334,7 @@ async def get_celestial_object(body_id: str, lat: float = None, lon: float = Non
             mag = mag_values.get(body_id, 0)
         
         # Berechne Auf- und Untergangszeiten
-        f = almanac.risings_and_settings(eph, body, location)
+        f = rise_set_function(body_id, lat, lon, elevation)
         
         # Suche nach dem nächsten Aufgang
         t1 = ts.now()
@@ -344,19 +343,20 @@ async def get_celestial_object(body_id: str, lat: float = None, lon: float = Non
         t2 = ts.from_datetime(tomorrow)
         times, events = almanac.find_discrete(t1, t2, f)
         
-        rise_time = None
-        set_time = None
+        rise_local = None
+        set_local = None
         
         for time, event in zip(times, events):
             # Konvertiere UTC zu lokaler Zeit
             local_time = time.utc_datetime().replace(tzinfo=timezone.utc).astimezone()
-            # Formatiere die Zeit als HH:MM
-            formatted_time = local_time.strftime('%H:%M')
             
             if event == 1:  # Aufgang
-                rise_time = formatted_time
+                rise_local = local_time
             else:  # Untergang
-                set_time = formatted_time
+                set_local = local_time
+        # Erst für die Ausgabe als HH:MM formatieren
+        rise_time = rise_local.strftime('%H:%M') if rise_local else None
+        set_time = set_local.strftime('%H:%M') if set_local else None
                 
         # Berechne die Transitzeit (Kulmination)
         transit_time = None
@@ -373,11 +373,13 @@ async def get_celestial_object(body_id: str, lat: float = None, lon: float = Non
             t_end = ts.from_datetime(datetime.now(timezone.utc) + timedelta(days=1))
             
             # Wenn Auf- und Untergangszeit bekannt sind, suche im Zeitraum dazwischen
-            if rise_time and set_time:
-                # Konvertiere Zeiten zu Datetime-Objekten
+            if rise_local and set_local:
+                # Uhrzeiten (auf Minuten) auf den heutigen Tag legen
                 now = datetime.now()
-                rise_dt = datetime.strptime(rise_time, '%H:%M').replace(year=now.year, month=now.month, day=now.day)
-                set_dt = datetime.strptime(set_time, '%H:%M').replace(year=now.year, month=now.month, day=now.day)
+                rise_dt = rise_local.replace(year=now.year, month=now.month, day=now.day,
+                                             second=0, microsecond=0, tzinfo=None)
+                set_dt = set_local.replace(year=now.year, month=now.month, day=now.day,
+                                           second=0, microsecond=0, tzinfo=None)
                 
                 # Wenn der Untergang vor dem Aufgang liegt, ist er am nächsten Tag
                 if set_dt < rise_dt:
@@ -388,11 +390,10 @@ async def get_celestial_object(body_id: str, lat: float = None, lon: float = Non
                 transit_time = transit_dt.strftime('%H:%M')
             else:
                 # Wenn keine Auf-/Untergangszeiten bekannt sind, verwende die aktuelle Position
-                # und prüfe, ob der Körper auf- oder absteigt
-                t_now = ts.now()
+                # und prüfe, ob der Körper auf- oder absteigt; die Höhe zum Zeitpunkt t ist bereits bekannt
                 t_later = ts.from_datetime(datetime.now(timezone.utc) + timedelta(hours=1))
                 
-                alt_now = culmination_at(t_now)
+                alt_now = alt.degrees
                 alt_later = culmination_at(t_later)
                 
                 # Wenn der Körper aufsteigt, liegt die Transitzeit in der Zukunft
@@ -459,6 +460,56 @@ async def get_celestial_object(body_id: str, lat: float = None, lon: float = Non
 
 # Die load_asteroid_data Funktion wurde entfernt, da sie nicht mehr benötigt wird
 
+def save_comet_cache(comets):
+    """
+    Speichert den Kometen-DataFrame spaltenweise als NumPy-Archiv: Zahlenspalten als float64,
+    Textspalten als Unicode-Arrays (fehlende Werte als ''), damit das Laden ohne pickle auskommt.
+    """
+    arrays = {}
+    for col in comets.columns:
+        if pd.api.types.is_numeric_dtype(comets[col]):
+            arrays[col] = comets[col].to_numpy(dtype=np.float64)
+        else:
+            arrays[col] = comets[col].fillna('').astype(str).to_numpy(dtype=str)
+    # Atomar ersetzen, damit gleichzeitige Anfragen nie eine halb geschriebene Datei lesen
+    bright_asteroids.savez_atomic(COMET_CACHE_FILE, **arrays)
+
+def load_comet_cache():
+    """Lädt den Kometen-Cache aus save_comet_cache() und indexiert ihn wieder nach 'designation'."""
+    with np.load(COMET_CACHE_FILE) as data:
+        comets = pd.DataFrame({col: data[col] for col in data.files})
+    return comets.set_index('designation', drop=False)
+
+def comet_orbit_constants(comets):
+    """
+    Gültige Kometenzeilen und ihre Bahnkonstanten (bright_asteroids.comet_orbit_constants()).
+    Zeilen mit unvollständigen Elementen fallen heraus, statt die gemeinsame Lichtlaufzeit-Iteration
+    mit NaN zu stören. Das Ergebnis wird zum jeweiligen DataFrame gespeichert, sodass Anfragen
+    nur neu rechnen, wenn load_comet_data() neue Daten geladen hat.
+    """
+    global comet_orbit_cache
+    if comet_orbit_cache is not None and comet_orbit_cache[0] is comets:
+        return comet_orbit_cache[1], comet_orbit_cache[2]
+
+    # Leere Tabelle oder fehlende Bahnelemente (Fallback nach Ladefehler): keine Kometen statt KeyError
+    if comets.empty or not set(bright_asteroids.COMET_ELEMENT_COLUMNS) <= set(comets.columns):
+        empty_constants = {'q': np.empty(0), 'e': np.empty(0), 'perihelion_tt': np.empty(0),
+                           'P': np.empty((0, 3)), 'Q': np.empty((0, 3))}
+        comet_orbit_cache = (comets, comets.iloc[0:0], empty_constants)
+        return comet_orbit_cache[1], comet_orbit_cache[2]
+
+    constants = bright_asteroids.comet_orbit_constants(comets, ts)
+    usable = (
+        np.isfinite(constants['q']) & (constants['q'] > 0)
+        & np.isfinite(constants['e']) & (constants['e'] >= 0)
+        & np.isfinite(constants['perihelion_tt'])
+        & np.isfinite(constants['P']).all(axis=1) & np.isfinite(constants['Q']).all(axis=1)
+    )
+    if not usable.all():
+        print(f"Skipping {int((~usable).sum())} comets with incomplete orbital elements")
+    comet_orbit_cache = (comets, comets[usable], {key: value[usable] for key, value in constants.items()})
+    return comet_orbit_cache[1], comet_orbit_cache[2]
+
 def load_comet_data():
     """Lade echte Kometendaten vom MPC und cachen sie für 24h.
 
@@ -469,21 +520,25 @@ def load_comet_data():
 
     # In-Memory Cache prüfen (24h gültig)
     if comet_data_cache is not None and comet_cache_timestamp is not None:
-        if (datetime.now() - comet_cache_timestamp).total_seconds() < 86400:
+        if time.time() - comet_cache_timestamp < 86400:
             print("Using cached comet dataframe (memory)")
             return comet_data_cache
 
     try:
-        # Pickle-Cache prüfen (24h gültig)
-        if os.path.exists(COMET_CACHE_FILE):
-            with open(COMET_CACHE_FILE, "rb") as f:
-                cache = pickle.load(f)
-            if isinstance(cache, dict) and "timestamp" in cache and "data" in cache:
-                if (datetime.now() - cache["timestamp"]).total_seconds() < 86400:
-                    print("Using cached comet dataframe (pickle)")
-                    comet_cache_timestamp = cache["timestamp"]
-                    comet_data_cache = cache["data"]
-                    return comet_data_cache
+        # Datei-Cache prüfen (24h gültig); das Alter ergibt sich aus der Änderungszeit der Datei,
+        # sodass eine veraltete Datei gar nicht erst geladen wird
+        cache_stat = bright_asteroids.file_stat(COMET_CACHE_FILE)
+        if cache_stat is not None and time.time() - cache_stat.st_mtime < 86400:
+            try:
+                comets = load_comet_cache()
+            except Exception as e:
+                # Unlesbarer Cache: wie ein fehlender behandeln und neu vom MPC laden
+                print(f"Comet cache is unreadable, reloading: {e}")
+            else:
+                print("Using cached comet dataframe (npz)")
+                comet_cache_timestamp = cache_stat.st_mtime
+                comet_data_cache = comets
+                return comet_data_cache
 
         # Echte Daten laden
         with load.open(mpc.COMET_URL) as f:
@@ -506,11 +561,10 @@ def load_comet_data():
             if col in comets.columns:
                 comets[col] = pd.to_numeric(comets[col], errors='coerce')
 
-        comet_cache_timestamp = datetime.now()
+        comet_cache_timestamp = time.time()
         comet_data_cache = comets
 
-        with open(COMET_CACHE_FILE, "wb") as f:
-            pickle.dump({"timestamp": comet_cache_timestamp, "data": comet_data_cache}, f)
+        save_comet_cache(comets)
 
         print(f"Loaded {len(comets)} comets from MPC and cached.")
         return comet_data_cache
@@ -522,17 +576,14 @@ def load_comet_data():
 @app.on_event("startup")
 async def startup_event():
     """Load data on startup."""
-    # Lade Kometendaten
-    load_comet_data()
+    # Lade Kometendaten und berechne ihre Bahnkonstanten vorab
+    comet_orbit_constants(load_comet_data())
     
     # Lade Benutzereinstellungen
     settings.load_settings()
-    
-    # Stelle sicher, dass das Cache-Verzeichnis existiert
-    os.makedirs("cache", exist_ok=True)
 
 @app.get(API_ENDPOINT_BRIGHT_ASTEROIDS)
-async def get_bright_asteroids(lat: float = None, lon: float = None, elevation: float = None, location_name: str = None, save_location: bool = False):
+def get_bright_asteroids(lat: float = None, lon: float = None, elevation: float = None, location_name: str = None, save_location: bool = False):
     """Get positions of the brightest minor planets (asteroids)."""
     try:
         # Hole Standortdaten aus den Einstellungen, wenn nicht übergeben
@@ -551,8 +602,6 @@ async def get_bright_asteroids(lat: float = None, lon: float = None, elevation:
         
         # Erstelle Skyfield-Objekte
         t = ts.now()
-        location = wgs84.latlon(lat, lon, elevation_m=elevation)
-        observer = eph['earth'] + location
         
         # Lade die hellsten Asteroiden
         loader = Loader('.')
@@ -577,15 +626,12 @@ async def get_bright_asteroids(lat: float = None, lon: float = None, elevation:
             "loading": False
         }
         
-        # Füge die Asteroiden zum Ergebnis hinzu
-        for i, asteroid in enumerate(bright_asteroid_list):
-            # Überprüfe, ob das Asteroid-Objekt ein Dictionary ist
-            if isinstance(asteroid, dict) and "name" in asteroid:
-                # Verwende einen eindeutigen Schlüssel für jeden Asteroiden
-                key = f"bright_asteroid_{i}_{asteroid['name']}"
-                result["bodies"][key] = asteroid
-            else:
-                print(f"Skipping invalid asteroid data at index {i}: {asteroid}")
+        # Füge die Asteroiden zum Ergebnis hinzu; load_bright_asteroids() liefert nur
+        # vollständige Dicts, die bereits nach Helligkeit gefiltert sind
+        result["bodies"] = {
+            f"bright_asteroid_{i}_{asteroid['name']}": asteroid
+            for i, asteroid in enumerate(bright_asteroid_list)
+        }
         
         print(f"Returning {len(result['bodies'])} bright asteroids")
         return result
@@ -597,7 +643,7 @@ async def get_bright_asteroids(lat: float = None, lon: float = None, elevation:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get(API_ENDPOINT_ASTEROIDS)
-async def get_asteroids(lat: float = None, lon: float = None, elevation: float = None, location_name: str = None, save_location: bool = False):
+def get_asteroids(lat: float = None, lon: float = None, elevation: float = None, location_name: str = None, save_location: bool = False):
     """Get visible asteroids."""
     try:
         # Verwende den Wert aus bright_asteroids.py
@@ -636,26 +682,23 @@ async def get_asteroids(lat: float = None, lon: float = None, elevation: float =
             "bodies": {}
         }
         
-        # Formatiere die Daten für die API-Antwort
-        for i, asteroid in enumerate(asteroid_list):
-            if isinstance(asteroid, dict) and "name" in asteroid:
-                # Verwende einen eindeutigen Schlüssel für jeden Asteroiden
-                key = f"asteroid_{i}_{asteroid['name']}"
-                result["bodies"][key] = {
-                    "name": asteroid["name"],
-                    "symbol": "•",  # Small dot for asteroids
-                    "type": "asteroid",
-                    "visible": True,  # Immer sichtbar, auch unter dem Horizont
-                    "altitude": float(asteroid["altitude"]),
-                    "azimuth": float(asteroid["azimuth"]),
-                    "distance": float(asteroid["distance"]),  # Entfernung in AU (keine Umrechnung)
-                    "magnitude": float(asteroid["magnitude"]),
-                    "rise_time": asteroid["rise_time"],
-                    "set_time": asteroid["set_time"],
-                    "transit_time": asteroid["transit_time"]
-                }
-            else:
-                print(f"Skipping invalid asteroid data at index {i}: {asteroid}")
+        # Formatiere die Daten für die API-Antwort (Liste ist bereits nach Helligkeit gefiltert)
+        result["bodies"] = {
+            f"asteroid_{i}_{asteroid['name']}": {
+                "name": asteroid["name"],
+                "symbol": "•",  # Small dot for asteroids
+                "type": "asteroid",
+                "visible": True,  # Immer sichtbar, auch unter dem Horizont
+                "altitude": asteroid["altitude"],
+                "azimuth": asteroid["azimuth"],
+                "distance": asteroid["distance"],  # Entfernung in AU (keine Umrechnung)
+                "magnitude": asteroid["magnitude"],
+                "rise_time": asteroid["rise_time"],
+                "set_time": asteroid["set_time"],
+                "transit_time": asteroid["transit_time"]
+            }
+            for i, asteroid in enumerate(asteroid_list)
+        }
         
         print(f"Returning {len(result['bodies'])} asteroids")
         return result
@@ -667,7 +710,7 @@ async def get_asteroids(lat: float = None, lon: float = None, elevation: float =
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get(API_ENDPOINT_COMETS)
-async def get_comets(lat: float = None, lon: float = None, elevation: float = None, location_name: str = None, save_location: bool = False):
+def get_comets(lat: float = None, lon: float = None, elevation: float = None, location_name: str = None, save_location: bool = False):
     """Get comets with real MPC data, no magnitude filtering, and rise/set/transit times."""
     try:
         # Hole Standortdaten aus den Einstellungen, wenn nicht übergeben
@@ -686,8 +729,7 @@ async def get_comets(lat: float = None, lon: float = None, elevation: float = No
 
         t = ts.now()
         # Benutze die Standortparameter
-        location = wgs84.latlon(lat, lon, elevation_m=elevation)
-        observer = eph['earth'] + location
+        _, observer = observer_for_location(lat, lon, elevation)
 
         global comet_data_cache
         if comet_data_cache is None:
@@ -698,106 +740,89 @@ async def get_comets(lat: float = None, lon: float = None, elevation: float = No
             "bodies": {}
         }
 
-        # Import constants for comet orbit calculation
-        from skyfield.constants import GM_SUN_Pitjeva_2005_km3_s2 as GM_SUN
-
         sun = eph['sun']
-
-        # Process comets - limit for performance
-        comet_count = 0
         max_comets = 100
 
-        # Process each comet in the dataframe
-        for designation, comet_row in comet_data_cache.iterrows():
+        # Zeitgitter und lokaler Tag sind für alle Kometen gleich
+        local_midnight = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+        start_time = ts.from_datetime(local_midnight)
+        step_days = bright_asteroids.RISE_SET_STEP_MINUTES / 1440.0
+        offsets = np.arange(int(round(bright_asteroids.RISE_SET_WINDOW_DAYS / step_days)) + 1) * step_days
+        time_grid = ts.tt_jd(start_time.whole, start_time.tt_fraction + offsets)
+        local_day = bright_asteroids.local_day_tt(ts)
+
+        # Ohne Kometen oder ohne Bahnelemente (z.B. leeres Fallback-DataFrame) gibt es nichts zu rechnen
+        if comet_data_cache.empty or not set(bright_asteroids.COMET_ELEMENT_COLUMNS) <= set(comet_data_cache.columns):
+            print("Returning 0 comets")
+            return result
+
+        # Bahnkonstanten werden nur einmal pro geladenem Kometen-DataFrame berechnet
+        comets, constants = comet_orbit_constants(comet_data_cache)
+        if comets.empty:
+            print("Returning 0 comets")
+            return result
+
+        # Positionen aller Kometen zum Zeitpunkt t in einem observe()-Aufruf (ein Zeitpunkt pro
+        # Komet, damit Lichtlaufzeit und Ablenkung elementweise rechnen), wie bei den Asteroiden
+        n_comets = len(comets)
+        t_rows = ts.tt_jd(np.full(n_comets, t.whole), np.full(n_comets, t.tt_fraction))
+        apparent = observer.at(t_rows).observe(
+            bright_asteroids.CometOrbitBatch(comets, ts, sun, constants=constants)
+        ).apparent()
+        alt, az, distance = apparent.altaz()
+        ra, dec, _ = apparent.radec()
+
+        # Process comets - limit for performance: die ersten max_comets mit gültiger Position
+        selected = np.flatnonzero(np.isfinite(alt.degrees) & np.isfinite(distance.au))
+        if len(selected) > max_comets:
+            print(f"Reached maximum comet count ({max_comets}), stopping processing")
+            selected = selected[:max_comets]
+        comets = comets.iloc[selected]
+        constants = {key: value[selected] for key, value in constants.items()}
+        n_comets = len(comets)
+        ra_deg, dec_deg = ra.hours[selected] * 15.0, dec.degrees[selected]
+        alt_deg, az_deg, distance_au = alt.degrees[selected], az.degrees[selected], distance.au[selected]
+
+        # Scheinbare Helligkeit aus den MPC-Parametern g und k: m = g + 5 log10(Δ) + 2.5 k log10(r)
+        # r ist der Betrag der heliozentrischen Bahnposition zum Zeitpunkt t
+        magnitudes = [None] * n_comets
+        if 'magnitude_g' in comets.columns and 'magnitude_k' in comets.columns:
+            helio_position, _ = bright_asteroids.comet_heliocentric_positions(t, constants)
+            r = np.sqrt(np.einsum('ij,ij->i', helio_position, helio_position))
+            magnitude_g = pd.to_numeric(comets['magnitude_g'], errors='coerce').to_numpy(dtype=float)
+            magnitude_k = pd.to_numeric(comets['magnitude_k'], errors='coerce').to_numpy(dtype=float)
+            m = (magnitude_g + 5.0 * np.log10(np.maximum(distance_au, 1e-12))
+                 + 2.5 * magnitude_k * np.log10(np.maximum(r, 1e-12)))
+            magnitudes = [round(value, 1) if np.isfinite(value) else None for value in m.tolist()]
+
+        # Rise/Set/Transit: Altitude und Stundenwinkel aller Kometen über das 48h-Gitter ab lokaler
+        # Mitternacht in einem observe()-Aufruf; die Nutation nur für die M Gitterzeiten berechnen
+        n_grid = len(offsets)
+        grid_times = ts.tt_jd(np.full(n_comets * n_grid, start_time.whole),
+                              np.tile(start_time.tt_fraction + offsets, n_comets))
+        grid_times._nutation_angles_radians = tuple(
+            np.tile(angle, n_comets) for angle in time_grid._nutation_angles_radians
+        )
+        grid = observer.at(grid_times).observe(
+            bright_asteroids.CometOrbitBatch(comets, ts, sun, repeat=n_grid, constants=constants)
+        ).apparent()
+        grid_altitudes = grid.altaz()[0].degrees.reshape(n_comets, n_grid)
+        grid_hour_angles = grid.hadec()[0].hours.reshape(n_comets, n_grid)
+
+        event_failures = []
+        comet_failures = []
+        names = comets['name'] if 'name' in comets.columns else comets['designation']
+        for k, (designation, name) in enumerate(zip(comets['designation'], names)):
             try:
-                if comet_count >= max_comets:
-                    print(f"Reached maximum comet count ({max_comets}), stopping processing")
-                    break
-
-                # Approximate apparent magnitude if possible using MPC M1/k1 formula: m = M1 + 5 log10(Δ) + k1 log10(r)
-                # Fallback to None if insufficient data
-                apparent_magnitude = None
-
-                # Prepare numeric fields for orbit creation
-                numeric_fields = ['e', 'q', 'i', 'om', 'w', 'epoch_tt', 'Tp', 'peri', 'node', 'incl', 'M1', 'k1']
-                comet_data = {}
-                for field, value in comet_row.items():
-                    if pd.notna(value) and field in numeric_fields:
-                        try:
-                            comet_data[field] = float(value)
-                        except (ValueError, TypeError):
-                            comet_data[field] = value
-                    else:
-                        comet_data[field] = value
-
-                # Create the comet orbit object
-                comet_obj = sun + mpc.comet_orbit(comet_data, ts, GM_SUN)
-
-                # Calculate position
-                astrometric = observer.at(t).observe(comet_obj)
-                apparent = astrometric.apparent()
-                alt, az, distance = apparent.altaz()
-                ra, dec, _ = apparent.radec()
-
-                # If M1/k1 available, estimate magnitude
-                try:
-                    r = (sun.at(t).observe(comet_obj).distance().au)
-                    delta = distance.au
-                    if pd.notna(comet_row.get('M1')) and pd.notna(comet_row.get('k1')):
-                        M1 = float(comet_row.get('M1'))
-                        k1 = float(comet_row.get('k1'))
-                        import math
-                        apparent_magnitude = float(M1) + 5.0 * math.log10(max(delta, 1e-12)) + float(k1) * math.log10(max(r, 1e-12))
-                except Exception:
-                    apparent_magnitude = apparent_magnitude if apparent_magnitude is not None else None
-
                 # Get name or designation
-                if 'name' in comet_row and comet_row['name'] and pd.notna(comet_row['name']):
-                    name = str(comet_row['name'])
-                else:
-                    name = designation
+                name = str(name) if name and pd.notna(name) else designation
 
-                # Rise/Set over next 48h starting at local midnight
                 try:
-                    now_local = datetime.now().astimezone()
-                    local_midnight = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
-                    start_dt_utc = local_midnight.astimezone(timezone.utc)
-                    end_dt_utc = (local_midnight + timedelta(days=2)).astimezone(timezone.utc)
-                    start_time = ts.from_datetime(start_dt_utc)
-                    end_time = ts.from_datetime(end_dt_utc)
-                    rise_set_func = almanac.risings_and_settings(eph, comet_obj, location)
-                    times, events = almanac.find_discrete(start_time, end_time, rise_set_func)
-                    rise_time, set_time = None, None
-                    for ti, event in zip(times, events):
-                        if event == 1 and rise_time is None:
-                            rise_time = ti.utc_datetime().replace(tzinfo=timezone.utc)
-                        elif event == 0 and set_time is None:
-                            set_time = ti.utc_datetime().replace(tzinfo=timezone.utc)
-
-                    # Transit time (choose highest altitude for local day)
-                    f = almanac.meridian_transits(eph, comet_obj, location)
-                    t_times, t_events = almanac.find_discrete(start_time, end_time, f)
-                    chosen_local_dt = None
-                    if len(t_times):
-                        now_local = datetime.now().astimezone()
-                        today_local = now_local.date()
-                        candidates = []
-                        for ti, ev in zip(t_times, t_events):
-                            utc_dt = ti.utc_datetime().replace(tzinfo=timezone.utc)
-                            local_dt = utc_dt.astimezone()
-                            try:
-                                alt_deg = observer.at(ti).observe(comet_obj).apparent().altaz()[0].degrees
-                            except Exception:
-                                alt_deg = float('-inf')
-                            candidates.append((local_dt, alt_deg, int(ev)))
-                        today_candidates = [c for c in candidates if c[0].date() == today_local]
-                        pool = today_candidates if today_candidates else candidates
-                        if pool:
-                            pool.sort(key=lambda x: (-x[1], x[0]))
-                            chosen_local_dt = pool[0][0]
-                    transit_time = chosen_local_dt
+                    rise_time, set_time, transit_time = bright_asteroids.find_horizon_events(
+                        time_grid, grid_altitudes[k], grid_hour_angles[k], local_day=local_day,
+                    )
                 except Exception as e:
-                    print(f"Rise/Set/Transit calculation failed for {designation}: {e}")
+                    event_failures.append(f"{designation}: {e}")
                     rise_time = None
                     set_time = None
                     transit_time = None
@@ -807,22 +832,25 @@ async def get_comets(lat: float = None, lon: float = None, elevation: float = No
                     "name": name,
                     "symbol": BODY_SYMBOLS.get('comet', '☄️'),
                     "type": "comet",
-                    "ra": ra.hours * 15.0,
-                    "dec": dec.degrees,
-                    "altitude": alt.degrees,
-                    "azimuth": az.degrees,
-                    "distance": round(distance.au, 3),
-                    "magnitude": round(float(apparent_magnitude), 1) if isinstance(apparent_magnitude, (int, float)) else None,
+                    "ra": float(ra_deg[k]),
+                    "dec": float(dec_deg[k]),
+                    "altitude": float(alt_deg[k]),
+                    "azimuth": float(az_deg[k]),
+                    "distance": round(float(distance_au[k]), 3),
+                    "magnitude": magnitudes[k],
                     "rise_time": bright_asteroids.format_time(rise_time),
                     "set_time": bright_asteroids.format_time(set_time),
                     "transit_time": bright_asteroids.format_time(transit_time)
                 }
-
-                comet_count += 1
             except Exception as e:
-                print(f"Error processing comet {designation}: {str(e)}")
+                comet_failures.append(f"{designation}: {str(e)}")
                 continue
 
+        # Fehler pro Komet nur zusammengefasst ausgeben
+        if event_failures:
+            print(f"Rise/Set/Transit calculation failed for {len(event_failures)} comets, first: {event_failures[0]}")
+        if comet_failures:
+            print(f"Error processing {len(comet_failures)} comets, first: {comet_failures[0]}")
         print(f"Returning {len(result['bodies'])} comets")
         return result
 
@@ -2,6 +2,11 @@ import { API_ENDPOINTS, CONFIG, ASCII_ART, ASTRO_CONSTANTS } from './constants.j
 import { t } from './i18n.js';
 import { settingsManager } from './settings.js';
 
+// Winkel in Grad auf [0, 360) abbilden, ohne Schleifen über Vielfache von 360°
+function normalizeAzimuth(degrees) {
+    return ((degrees % 360) + 360) % 360;
+}
+
 export class SkyRenderer {
     constructor(containerId) {
         this.container = document.getElementById(containerId);
@@ -86,9 +91,7 @@ export class SkyRenderer {
         // Bestimme die Richtung, die aktuell "aus dem Blick" liegt: die mit effektivem Azimut am nächsten zu 0°
         // Standard (horizontalShift=0): N ist am nächsten zu 0° => O,S,W bleiben sichtbar
         const withEffective = positions.map(p => {
-            let eff = p.azimuth - this.horizontalShift;
-            while (eff < 0) eff += 360;
-            while (eff >= 360) eff -= 360;
+            const eff = normalizeAzimuth(p.azimuth - this.horizontalShift);
             const distToZero = Math.min(eff, 360 - eff); // Abstand zu 0° entlang des Kreises
             return { ...p, effectiveAzimuth: eff, distToZero };
         });
@@ -279,9 +282,7 @@ export class SkyRenderer {
                     } else {
                         row = Math.round(horizonRow + (Math.abs(obj.altitude) / 90 * (height - horizonRow - 1)));
                     }
-                    let effectiveAzimuth = obj.azimuth - this.horizontalShift;
-                    while (effectiveAzimuth < 0) effectiveAzimuth += 360;
-                    while (effectiveAzimuth >= 360) effectiveAzimuth -= 360;
+                    const effectiveAzimuth = normalizeAzimuth(obj.azimuth - this.horizontalShift);
                     col = Math.round((effectiveAzimuth / 360) * (width - 2)) + 1;
                 }
                 if (row === null || col === null) continue;
@@ -360,11 +361,8 @@ export class SkyRenderer {
         // Nutze den vollen Bereich 0°–360° über die gesamte Breite
         
         // Berechne den effektiven Azimut mit Verschiebung
-        let effectiveAzimuth = obj.azimuth - this.horizontalShift;
-        
         // Normalisiere den Azimut auf den Bereich 0-360
-        while (effectiveAzimuth < 0) effectiveAzimuth += 360;
-        while (effectiveAzimuth >= 360) effectiveAzimuth -= 360;
+        const effectiveAzimuth = normalizeAzimuth(obj.azimuth - this.horizontalShift);
         
         // Berechne die Spalte basierend auf dem normalisierten Azimut
         const col = Math.round((effectiveAzimuth / 360) * (width - 2)) + 1;
@@ -573,11 +571,8 @@ export class SkyRenderer {
                                 Math.round(CONFIG.HORIZON_ROW - (obj.altitude / 90 * CONFIG.HORIZON_ROW)) :
                                 Math.round(CONFIG.HORIZON_ROW + (Math.abs(obj.altitude) / 90 * (CONFIG.SKY_HEIGHT - CONFIG.HORIZON_ROW - 1)));
                         
-                        let effectiveAzimuth = obj.azimuth - this.horizontalShift;
-                        
                         // Normalisiere den Azimut auf den Bereich 0-360
-                        while (effectiveAzimuth < 0) effectiveAzimuth += 360;
-                        while (effectiveAzimuth >= 360) effectiveAzimuth -= 360;
+                        const effectiveAzimuth = normalizeAzimuth(obj.azimuth - this.horizontalShift);
                         
                         const objCol = obj.displayCol !== undefined ? obj.displayCol :
                             Math.round((effectiveAzimuth / 360) * (CONFIG.SKY_WIDTH - 2)) + 1;